@@ -0,0 +1,82 @@
+"""
+Build ``DATABASES`` from ``DB_*`` environment variables.
+
+    DB_ENGINE              mysql (default), postgresql, sqlite or a backend path
+    DB_NAME, DB_HOST, DB_PORT, DB_USER, DB_PASSWORD
+    DB_CONN_MAX_AGE        seconds to keep a connection open; 0 closes it
+                           after every request (default 60)
+    DB_CONN_HEALTH_CHECKS  ping persistent connections before reuse (default on)
+    DB_POOL                PostgreSQL only: use a psycopg connection pool of
+                           DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections
+
+Setting DB_REPLICA_HOST or DB_REPLICA_NAME adds a ``replica`` alias. Its
+settings are read from ``DB_REPLICA_*``, falling back to the primary's.
+Reads are then routed by LittleLemonAPI.routers.ReplicaRouter. To try the
+router locally with two SQLite files:
+
+    DB_ENGINE=sqlite DB_NAME=primary.sqlite3 DB_REPLICA_NAME=replica.sqlite3
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+ENGINES = {
+    'mysql': 'django.db.backends.mysql',
+    'postgresql': 'django.db.backends.postgresql',
+    'sqlite': 'django.db.backends.sqlite3',
+}
+
+DEFAULTS = {
+    'ENGINE': 'mysql',
+    'NAME': 'littlelemon',
+    'HOST': 'localhost',
+    'USER': 'root',
+    'PASSWORD': '1234',
+    'PORT': '3306',
+    'CONN_MAX_AGE': '60',
+    'CONN_HEALTH_CHECKS': 'true',
+    'POOL': 'false',
+    'POOL_MIN_SIZE': '2',
+    'POOL_MAX_SIZE': '10',
+}
+
+
+def flag(value):
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_from_env(environ, prefix, fallback):
+    def get(name):
+        return environ.get(prefix + name, fallback[name])
+
+    engine = ENGINES.get(get('ENGINE'), get('ENGINE'))
+    database = {
+        'ENGINE': engine,
+        'NAME': get('NAME'),
+        'CONN_MAX_AGE': int(get('CONN_MAX_AGE')),
+        'CONN_HEALTH_CHECKS': flag(get('CONN_HEALTH_CHECKS')),
+    }
+    if engine != ENGINES['sqlite']:
+        database.update(HOST=get('HOST'), PORT=get('PORT'), USER=get('USER'), PASSWORD=get('PASSWORD'))
+    if flag(get('POOL')):
+        if engine != ENGINES['postgresql']:
+            raise ImproperlyConfigured('%sPOOL is only supported with PostgreSQL' % prefix)
+        # Pooled connections are returned to the pool, not kept per thread.
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {'pool': {
+            'min_size': int(get('POOL_MIN_SIZE')),
+            'max_size': int(get('POOL_MAX_SIZE')),
+        }}
+    return database
+
+
+def build_databases(environ=os.environ):
+    primary = {name: environ.get('DB_' + name, value) for name, value in DEFAULTS.items()}
+    databases = {'default': database_from_env(environ, 'DB_', DEFAULTS)}
+    if environ.get('DB_REPLICA_HOST') or environ.get('DB_REPLICA_NAME'):
+        replica = database_from_env(environ, 'DB_REPLICA_', primary)
+        # Tests run against the primary rather than a second test database.
+        replica['TEST'] = {'MIRROR': 'default'}
+        databases['replica'] = replica
+    return databases
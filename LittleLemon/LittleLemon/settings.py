@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 
 from pathlib import Path
 
+from .databases import build_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'LittleLemonAPI.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,17 +81,114 @@ WSGI_APPLICATION = 'LittleLemon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
-DATABASES = {
+# Built from DB_* environment variables; see LittleLemon/databases.py. With
+# no variables set this is the local MySQL database on persistent connections.
+DATABASES = build_databases()
+
+# Sends the menu and order endpoints' reads to DATABASES['replica'] when it
+# is configured; a no-op otherwise.
+DATABASE_ROUTERS = ['LittleLemonAPI.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+# The menu generation, snapshots, throttles and idempotency locks must be
+# seen by every worker, so the default cache is the file-based one, shared
+# by the processes of this host. Deploys on several hosts should use Redis
+# or Memcached; per-process caches (LocMemCache) fail LittleLemonAPI's
+# system checks wherever they would break invalidation.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'littlelemon',
-        'HOST': 'localhost',
-        'USER': 'root',
-        'PASSWORD': '1234',
-        'PORT': '3306'
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(BASE_DIR / 'cache'),
     }
 }
 
+# Cached menu listings are keyed on a generation counter that is bumped on
+# every MenuItem/Category write, so the timeout only bounds memory use. The
+# counter must live in a cache every worker shares (LittleLemonAPI.E003).
+MENU_CACHE_ALIAS = 'default'
+MENU_CACHE_TIMEOUT = 300
+
+# Precompiled menu list pages (LittleLemonAPI/snapshots.py): a directory
+# path writes them to disk, 'cache' keeps them in the menu cache, None turns
+# the fast path off. Both stores follow the menu generation, so they need a
+# menu cache shared by all workers (see LittleLemonAPI/checks.py). Pages are compiled for each MENU_SNAPSHOT_PERPAGE size
+# and republished after every menu write, or with `manage.py publish_menu`.
+# A loaded or cached snapshot is re-checked after MENU_SNAPSHOT_TIMEOUT.
+MENU_SNAPSHOT_STORE = str(BASE_DIR / 'menu_snapshots')
+MENU_SNAPSHOT_TIMEOUT = 300
+MENU_SNAPSHOT_PERPAGE = [2]
+MENU_SNAPSHOT_PUBLISH_ON_WRITE = True
+
+# Seconds a user's group names (and each role's members) are cached between
+# requests; 0 disables it. Invalidation only reaches the cache the writer
+# uses, so enabling this needs a CACHES['default'] shared by every worker,
+# not LocMemCache (enforced by LittleLemonAPI/checks.py).
+ROLE_CACHE_TIMEOUT = 0
+
+# Token -> user/roles cache used by CachedTokenAuthentication: entries stay
+# TOKEN_CACHE_TIMEOUT seconds in the cache (0 disables it; like the role
+# cache it needs a shared CACHES['default']) and TOKEN_CACHE_LOCAL_TTL
+# seconds in each process's LRU of TOKEN_CACHE_SIZE entries. With a shared
+# cache the local TTL bounds how long another process may still accept a
+# revoked token.
+TOKEN_CACHE_TIMEOUT = 0
+TOKEN_CACHE_LOCAL_TTL = 10
+TOKEN_CACHE_SIZE = 10000
+
+# Idempotency-Key handling for cart and checkout POSTs: responses are kept
+# IDEMPOTENCY_TTL seconds; a concurrent duplicate waits up to
+# IDEMPOTENCY_WAIT seconds for the first one. The lock needs a cache shared
+# by all workers to collapse duplicates across processes.
+IDEMPOTENCY_TTL = 86400
+IDEMPOTENCY_WAIT = 10
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+
+# New orders go to the on-shift delivery crew member with the fewest open
+# orders. Those counts live in the cache and are reloaded from the orders
+# after CREW_QUEUE_TIMEOUT seconds.
+AUTO_ASSIGN_ORDERS = True
+CREW_QUEUE_TIMEOUT = 300
+
+# Render page-based menu, cart and order lists from values_list() rows with
+# LittleLemonAPI.readers instead of instantiating models and serializers.
+FAST_READ_SERIALIZERS = True
+
+# Dotted path to the menu search backend; None picks the MySQL FULLTEXT
+# backend on MySQL and the in-process inverted index elsewhere.
+MENU_SEARCH_BACKEND = None
+
+# Where throttle counters live: 'local' for per-process memory or the alias
+# of a cache shared by every worker.
+THROTTLE_STORE = 'default'
+
+# Read endpoints served by LittleLemonAPI.async_views for plain GETs:
+# any of 'menu_items', 'cart', 'orders'. Best used under an ASGI server.
+ASYNC_READ_ROUTES = []
+
+# orders/events streams order status and delivery crew changes as
+# Server-Sent Events (ASGI only). ORDER_EVENTS_BACKEND is a dotted path to
+# the hub: None keeps it in process, which only suits a single worker;
+# 'LittleLemonAPI.events.CacheOrderEvents' shares it through the default
+# cache, polled every ORDER_EVENTS_POLL seconds. Reconnecting clients can
+# replay the last ORDER_EVENTS_REPLAY events.
+ORDER_EVENTS_BACKEND = None
+ORDER_EVENTS_REPLAY = 1000
+ORDER_EVENTS_TTL = 3600
+ORDER_EVENTS_POLL = 1
+ORDER_EVENTS_HEARTBEAT = 15
+ORDER_EVENTS_STREAM_TIMEOUT = 300
+
+# Per-request SQL/serializer/permission/throttle timings, reported as
+# Server-Timing headers, JSON log lines and the manager-only
+# profiling/slowest endpoint. Off by default; the middleware then removes
+# itself at startup.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 1.0
+PROFILING_SLOWEST = 50
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -135,12 +235,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK={
     'DEFAULT_AUTHENTICATION_CLASSES':(
-        'rest_framework.authentication.TokenAuthentication',
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'LittleLemonAPI.throttling.AnonThrottle',
+        'LittleLemonAPI.throttling.UserThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '2/minute',
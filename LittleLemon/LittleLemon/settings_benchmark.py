@@ -0,0 +1,28 @@
+"""
+Settings for the benchmark harness: the regular settings on a local SQLite
+database, with throttling raised out of the way.
+
+    DJANGO_SETTINGS_MODULE=LittleLemon.settings_benchmark python manage.py migrate
+    DJANGO_SETTINGS_MODULE=LittleLemon.settings_benchmark python manage.py seed_benchmark
+    DJANGO_SETTINGS_MODULE=LittleLemon.settings_benchmark python manage.py benchmark --output bench.json
+    DJANGO_SETTINGS_MODULE=LittleLemon.settings_benchmark python manage.py explain_queries --analyze
+"""
+
+from .settings import *
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['testserver']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'benchmark.sqlite3',
+    }
+}
+
+REST_FRAMEWORK = dict(REST_FRAMEWORK)
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {
+    'anon': '1000000/minute',
+    'user': '1000000/minute',
+}
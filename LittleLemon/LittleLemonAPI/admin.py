@@ -5,8 +5,12 @@ from .models import *
 @admin.register(Category,
                 MenuItem,
                 Cart,
+                CartSummary,
                 Order,
-                OrderItem)
+                OrderItem,
+                DailySales,
+                DailyMenuItemSales,
+                DailyCrewDeliveries)
 
 class Admin(admin.ModelAdmin):
     pass
\ No newline at end of file
@@ -0,0 +1,143 @@
+import heapq
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Case, When, Value, IntegerField
+from django.utils import timezone
+
+from .models import Order, OffShift
+from .events import order_event, publish_order_change
+from .roles import DELIVERY_CREW, get_role_member_ids
+
+
+def queue_cache_key(crew_id):
+    return 'littlelemon:crew:open:%s' % crew_id
+
+def queue_timeout():
+    # Counters are adjusted in place and reloaded from the orders when they
+    # expire, which also bounds how long any drift can last.
+    return getattr(settings, 'CREW_QUEUE_TIMEOUT', 300)
+
+def open_queue(order):
+    """The crew member whose queue an order is waiting in, if any."""
+    return order.delivery_crew_id if not order.status else None
+
+def open_order_counts(crew_ids):
+    """Open orders per crew member, from the cache with one query for misses."""
+    keys = {crew_id: queue_cache_key(crew_id) for crew_id in crew_ids}
+    cached = cache.get_many(keys.values())
+    counts = {crew_id: cached[key] for crew_id, key in keys.items() if key in cached}
+    missing = [crew_id for crew_id in crew_ids if crew_id not in counts]
+    if missing:
+        loaded = dict.fromkeys(missing, 0)
+        loaded.update(
+            Order.objects.filter(delivery_crew__in=missing, status=False)
+            .values_list('delivery_crew').annotate(open=Count('id'))
+        )
+        for crew_id, count in loaded.items():
+            # add() so a concurrent adjustment is not overwritten.
+            cache.add(keys[crew_id], count, queue_timeout())
+        counts.update(loaded)
+    return counts
+
+def adjust_queue(crew_id, delta):
+    try:
+        cache.incr(queue_cache_key(crew_id), delta)
+    except ValueError:
+        # Not cached: the next read loads the committed count.
+        pass
+
+def move_open_orders(before, after, count=1):
+    """Move ``count`` open orders between queues once the transaction commits."""
+    if before == after:
+        return
+    def apply():
+        if before:
+            adjust_queue(before, -count)
+        if after:
+            adjust_queue(after, count)
+    transaction.on_commit(apply)
+
+@contextmanager
+def tracking_queue(order):
+    """Keep the queue counters right across an order update.
+
+        with tracking_queue(order):
+            serialized_order.save()
+    """
+    before = open_queue(order)
+    yield
+    move_open_orders(before, open_queue(order))
+
+
+def get_off_shift():
+    return set(OffShift.objects.values_list('user', flat=True))
+
+def set_off_shift(crew_id, off):
+    # One row per crew member, so concurrent changes cannot undo each other
+    # and every worker sees them.
+    if off:
+        OffShift.objects.get_or_create(user_id=crew_id)
+    else:
+        OffShift.objects.filter(user_id=crew_id).delete()
+
+def available_crew(exclude=()):
+    offShift = get_off_shift()
+    return [crew_id for crew_id in get_role_member_ids(DELIVERY_CREW)
+            if crew_id not in offShift and crew_id not in exclude]
+
+def pick_crew():
+    """The on-shift crew member with the fewest open orders, or None."""
+    if not getattr(settings, 'AUTO_ASSIGN_ORDERS', True):
+        return None
+    crewIds = available_crew()
+    if not crewIds:
+        return None
+    counts = open_order_counts(crewIds)
+    return min(crewIds, key=lambda crew_id: (counts[crew_id], crew_id))
+
+
+@transaction.atomic
+def reassign_open_orders(from_crew, to_crew=None):
+    """Hand ``from_crew``'s open orders to ``to_crew`` or spread them out.
+
+    Without ``to_crew`` each order goes to whoever is least loaded at that
+    point, the same rule new orders follow. Either way it is one UPDATE
+    with a CASE branch per receiving crew member.
+    Returns ``{crew_id: orders moved}``.
+    """
+    orders = Order.objects.select_for_update().filter(delivery_crew=from_crew, status=False)
+    customers = dict(orders.order_by('date', 'id').values_list('pk', 'user'))
+    orderIds = list(customers)
+    if not orderIds:
+        return {}
+
+    if to_crew is not None:
+        targets = {to_crew: orderIds}
+    else:
+        crewIds = available_crew(exclude=(from_crew,))
+        if not crewIds:
+            return {}
+        counts = open_order_counts(crewIds)
+        heap = [(counts[crew_id], crew_id) for crew_id in crewIds]
+        heapq.heapify(heap)
+        targets = {}
+        for orderId in orderIds:
+            count, crew_id = heapq.heappop(heap)
+            targets.setdefault(crew_id, []).append(orderId)
+            heapq.heappush(heap, (count + 1, crew_id))
+
+    # update() skips auto_now, so move the ETag validator by hand.
+    Order.objects.filter(pk__in=orderIds).update(
+        delivery_crew=Case(*[When(pk__in=ids, then=Value(crew_id)) for crew_id, ids in targets.items()],
+                           output_field=IntegerField()),
+        updated_at=timezone.now(),
+    )
+    for crew_id, ids in targets.items():
+        move_open_orders(from_crew, crew_id, len(ids))
+        for orderId in ids:
+            order = Order(pk=orderId, user_id=customers[orderId], status=False, delivery_crew_id=crew_id)
+            publish_order_change(order_event(order, previous_crew=from_crew))
+    return {crew_id: len(ids) for crew_id, ids in targets.items()}
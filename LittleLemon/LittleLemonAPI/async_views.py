@@ -0,0 +1,255 @@
+"""
+Async-native GET handlers for the read-heavy endpoints.
+
+They answer the same requests as the DRF ViewSets in views.py with the
+same JSON, but authenticate, check roles and query through Django's async
+ORM, so under an ASGI server a request waiting on the database does not
+hold a thread. Anything they do not cover (writes, cursor pagination) is
+handed to the sync ViewSet. ``async_read`` wires a pair into one URL.
+"""
+
+import functools
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aget_user
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+
+from .models import MenuItem, Order
+from .cache import menu_list_version, acached_menu_response
+from .conditional import ConditionalGetMixin, row_etag
+from .readers import menu_item_reader, cart_reader, order_reader
+from .events import get_order_events, can_see
+from .authentication import resolve_token
+from .roles import MANAGER, DELIVERY_CREW, aget_roles, remember_roles
+from .profiling import section
+from .routers import replica_reads
+from .snapshots import snapshot_response
+from .throttling import UserThrottle, AnonThrottle
+from .views import MenuItemView, CustomerCartView, OrdersView
+
+EVENT_RETRY_MS = 3000
+
+
+def json_response(data, status=200, **headers):
+    response = HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+def detail(message, status, **headers):
+    return json_response({'detail': message}, status, **headers)
+
+async def aauthenticate(request):
+    """Token authentication first, then the session, as in REST_FRAMEWORK."""
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if header and header[0].lower() == 'token':
+        if len(header) != 2:
+            return None, detail('Invalid token header.', 401, **{'WWW-Authenticate': 'Token'})
+        try:
+            user, roles = await sync_to_async(resolve_token)(header[1])
+        except AuthenticationFailed as error:
+            return None, detail(str(error.detail), 401, **{'WWW-Authenticate': 'Token'})
+        remember_roles(request, roles)
+        return user, None
+    return await aget_user(request), None
+
+async def acheck(request, view, customers_only=False):
+    """Authenticate, authorize and throttle; returns an error response or None."""
+    user, error = await aauthenticate(request)
+    if error:
+        return error
+    request.user = user
+    if not user.is_authenticated:
+        return detail('Authentication credentials were not provided.', 401, **{'WWW-Authenticate': 'Token'})
+    request.roles = await aget_roles(request, user)
+    if customers_only and (MANAGER in request.roles or DELIVERY_CREW in request.roles):
+        return detail('You do not have permission to perform this action.', 403)
+    with section('throttle'):
+        for throttle in (UserThrottle(), AnonThrottle()):
+            if not await sync_to_async(throttle.allow_request)(request, view):
+                wait = int(throttle.wait())
+                return detail('Request was throttled. Expected available in %d seconds.' % wait, 429,
+                              **{'Retry-After': str(wait)})
+    return None
+
+async def apage(reader, queryset, query_params):
+    """The rows ``Paginator.page()`` would return, without its COUNT query.
+
+    An out-of-range page is empty either way, so slicing is enough.
+    """
+    perpage = int(query_params.get('perpage', 2))
+    page = int(query_params.get('page', 1))
+    if page < 1:
+        return []
+    rows = reader.values(queryset)[(page - 1) * perpage:page * perpage]
+    return reader.read([row async for row in rows])
+
+def from_replica(async_view):
+    @functools.wraps(async_view)
+    async def view(request, *args, **kwargs):
+        with replica_reads():
+            return await async_view(request, *args, **kwargs)
+    return view
+
+
+@from_replica
+async def menu_items_list(request):
+    view = MenuItemView()
+    error = await acheck(request, view)
+    if error:
+        return error
+    snapshot = await sync_to_async(snapshot_response)(request, request.GET)
+    if snapshot is not None:
+        return snapshot
+    version = await sync_to_async(menu_list_version)(request.GET, 'list')
+
+    async def build():
+        menuItemList = await sync_to_async(view.get_menu_items)(request.GET)
+        return await apage(menu_item_reader, menuItemList, request.GET)
+    etag, data = await acached_menu_response(version, build)
+    # The same Vary as the DRF view, whose browsable API shares the ETag.
+    notModified = ConditionalGetMixin().not_modified(request, etag=etag)
+    if notModified:
+        notModified['Vary'] = 'Accept'
+        return notModified
+    return json_response(data, ETag=etag, Vary='Accept')
+
+@from_replica
+async def menu_items_retrieve(request, pk):
+    error = await acheck(request, MenuItemView())
+    if error:
+        return error
+    menuItem = await MenuItem.objects.select_related('category').filter(pk=pk).afirst()
+    if menuItem is None:
+        return detail('No MenuItem matches the given query.', 404)
+    etag = row_etag(menuItem.pk, menuItem.updated_at)
+    mixin = ConditionalGetMixin()
+    notModified = mixin.not_modified(request, etag=etag, last_modified=menuItem.updated_at)
+    if notModified:
+        return notModified
+    data = menu_item_reader.read([[getattr_path(menuItem, column) for column in menu_item_reader.columns]])[0]
+    return mixin.with_validators(json_response(data), etag=etag, last_modified=menuItem.updated_at)
+
+async def cart_list(request):
+    view = CustomerCartView()
+    error = await acheck(request, view, customers_only=True)
+    if error:
+        return error
+    cart = view.get_cart(request.GET, request.user)
+    return json_response(await apage(cart_reader, cart, request.GET))
+
+@from_replica
+async def orders_list(request):
+    view = OrdersView()
+    error = await acheck(request, view)
+    if error:
+        return error
+    orders = view.get_orders(request.GET, request.user, request.roles)
+    return json_response(await apage(order_reader, orders, request.GET))
+
+@from_replica
+async def orders_retrieve(request, pk):
+    error = await acheck(request, OrdersView())
+    if error:
+        return error
+    if MANAGER in request.roles or DELIVERY_CREW in request.roles:
+        return json_response({'message': 'Unauthorized User'}, 401)
+    order = await Order.objects.select_related('user', 'delivery_crew').filter(pk=pk).afirst()
+    if order is None:
+        return detail('No Order matches the given query.', 404)
+    if order.user_id != request.user.pk:
+        return json_response({'message': 'Unauthorized User'}, 401)
+    etag = row_etag(order.pk, order.updated_at)
+    mixin = ConditionalGetMixin()
+    notModified = mixin.not_modified(request, etag=etag, last_modified=order.updated_at)
+    if notModified:
+        return notModified
+    data = order_reader.read([[getattr_path(order, column) for column in order_reader.columns]])[0]
+    return mixin.with_validators(json_response(data), etag=etag, last_modified=order.updated_at)
+
+async def order_events(request):
+    """Server-Sent Events stream of order status and delivery crew changes.
+
+    Customers get their own orders, crew the orders assigned to or taken
+    from them, managers everything; ``?order=`` narrows it to one order.
+    A reconnecting client sends ``Last-Event-ID`` (or ``?last_event_id=``)
+    and gets what it missed from the replay log, or a ``reset`` event when
+    that is gone and it should reload the list. Streams end after
+    ORDER_EVENTS_STREAM_TIMEOUT seconds and the browser reconnects. Needs
+    an ASGI server: under WSGI the response is buffered until it ends.
+    """
+    if request.method != 'GET':
+        return detail('Method "%s" not allowed.' % request.method, 405, Allow='GET')
+    error = await acheck(request, OrdersView())
+    if error:
+        return error
+    try:
+        lastEventId = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        lastEventId = int(lastEventId) if lastEventId else None
+        orderId = int(request.GET['order']) if request.GET.get('order') else None
+        if lastEventId is not None and lastEventId < 0:
+            raise ValueError(lastEventId)
+    except ValueError:
+        return json_response({'message': 'Invalid order or Last-Event-ID'}, 400)
+
+    hub = get_order_events()
+    if lastEventId is None:
+        lastEventId = await sync_to_async(hub.last_id)()
+    userId, roles = request.user.pk, request.roles
+    heartbeat = getattr(settings, 'ORDER_EVENTS_HEARTBEAT', 15)
+
+    async def stream():
+        lastId = lastEventId
+        deadline = time.monotonic() + getattr(settings, 'ORDER_EVENTS_STREAM_TIMEOUT', 300)
+        yield 'retry: %d\n\n' % EVENT_RETRY_MS
+        events = await sync_to_async(hub.events_after)(lastId)
+        while True:
+            if events is None:
+                lastId = await sync_to_async(hub.last_id)()
+                yield 'id: %d\nevent: reset\ndata: {}\n\n' % lastId
+            elif events:
+                for event in events:
+                    lastId = event['id']
+                    if can_see(event, userId, roles) and orderId in (None, event['order']):
+                        yield 'id: %d\nevent: order\ndata: %s\n\n' % (event['id'], json.dumps({
+                            'order': event['order'],
+                            'status': event['status'],
+                            'delivery_crew': event['delivery_crew'],
+                        }))
+            else:
+                yield ': keep-alive\n\n'
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = await hub.wait(lastId, min(heartbeat, remaining))
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def getattr_path(instance, column):
+    for name in column.split('__'):
+        if instance is None:
+            return None
+        instance = getattr(instance, name)
+    return instance
+
+
+def async_read(async_view, sync_view):
+    """One URL served by ``async_view`` for plain GETs and ``sync_view`` otherwise."""
+    sync_view = sync_to_async(sync_view)
+
+    @functools.wraps(async_view)
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET' and 'cursor' not in request.GET:
+            return await async_view(request, *args, **kwargs)
+        return await sync_view(request, *args, **kwargs)
+    # The DRF view behind it does its own CSRF checks for session users.
+    view.csrf_exempt = True
+    return view
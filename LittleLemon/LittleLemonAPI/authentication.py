@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .roles import remember_roles
+from .tokens import token_cache
+
+
+def load_token(key):
+    """The cache entry for a token: one query for the user, one for the groups."""
+    try:
+        token = Token.objects.select_related('user').get(key=key)
+    except Token.DoesNotExist:
+        return None
+    return {
+        'user_id': token.user_id,
+        'username': token.user.username,
+        'is_active': token.user.is_active,
+        'roles': frozenset(token.user.groups.values_list('name', flat=True)),
+    }
+
+def resolve_token(key):
+    """Return ``(user, roles)`` for a token key, raising AuthenticationFailed.
+
+    The user is built from the cached entry with only ``id``, ``username``
+    and ``is_active`` loaded; other fields load on first access, and
+    ``save()`` only writes the loaded ones.
+    """
+    entry = token_cache.get(key)
+    if entry is None:
+        entry = load_token(key)
+        if entry is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        token_cache.set(key, entry)
+    if not entry['is_active']:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    user = User.from_db(DEFAULT_DB_ALIAS, ['id', 'username', 'is_active'],
+                        [entry['user_id'], entry['username'], entry['is_active']])
+    return user, entry['roles']
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication answered from the token cache.
+
+    A warm request authenticates and learns the user's roles without a
+    query; the roles are handed to ``get_roles()`` for the permission checks.
+    """
+
+    def authenticate(self, request):
+        self.request = request
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        user, roles = resolve_token(key)
+        remember_roles(self.request, roles)
+        return user, Token(key=key, user=user)
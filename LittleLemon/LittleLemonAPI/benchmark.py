@@ -0,0 +1,410 @@
+import datetime
+import random
+import time
+import warnings
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import path as url_path
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import async_views
+from .models import Category, MenuItem, Cart, Order, OrderItem
+from .assignment import set_off_shift
+from .cache import bump_menu_generation
+from .carts import clear_cart, rebuild_summaries
+from .events import get_order_events, order_event
+from .roles import MANAGER, DELIVERY_CREW
+from .rollups import rebuild
+from .search import get_search_backend
+
+BATCH_SIZE = 5000
+WORDS = ['Lemon', 'Greek', 'Salad', 'Bruschetta', 'Pasta', 'Grilled', 'Fish', 'Lamb',
+         'Souvlaki', 'Cake', 'Baklava', 'Spicy', 'Garlic', 'Feta', 'Olive', 'Tomato']
+
+
+def batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def bulk_insert(model, rows):
+    for batch in batched(rows):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+
+
+class Seeder:
+    """Bulk-load benchmark volumes straight through ``bulk_create``.
+
+    Signals are bypassed for speed, so the menu cache generation, the
+    search index and the sales rollups are rebuilt once at the end instead
+    of per row.
+    """
+
+    def __init__(self, menu_items=10000, users=100000, orders=1000000, categories=20, seed=0):
+        self.menu_items = menu_items
+        self.users = users
+        self.orders = orders
+        self.categories = categories
+        self.random = random.Random(seed)
+
+    def run(self, log=print):
+        started = time.perf_counter()
+        Group.objects.get_or_create(name=MANAGER)
+        crewGroup, _ = Group.objects.get_or_create(name=DELIVERY_CREW)
+
+        bulk_insert(Category, (
+            Category(slug='category-%d' % index, title='Category %d' % index)
+            for index in range(self.categories)
+        ))
+        categoryIds = list(Category.objects.values_list('pk', flat=True))
+        bulk_insert(MenuItem, (
+            MenuItem(
+                title='%s %s %d' % (self.random.choice(WORDS), self.random.choice(WORDS), index),
+                price=Decimal(self.random.randint(100, 5000)) / 100,
+                featured=self.random.random() < 0.1,
+                category_id=self.random.choice(categoryIds),
+            )
+            for index in range(self.menu_items)
+        ))
+        log('menu items: %d' % self.menu_items)
+
+        # Hashing once keeps 100k users from costing 100k PBKDF2 runs.
+        password = make_password('benchmark')
+        firstUser = User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        bulk_insert(User, (
+            User(username='bench_user_%d' % (firstUser + index), password=password)
+            for index in range(self.users)
+        ))
+        userIds = list(User.objects.filter(username__startswith='bench_user_').values_list('pk', flat=True))
+        log('users: %d' % self.users)
+
+        crewIds = userIds[:max(1, len(userIds) // 1000)]
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=pk, group_id=crewGroup.pk) for pk in crewIds],
+            ignore_conflicts=True,
+        )
+        customerIds = userIds[len(crewIds):]
+
+        menuItemPrices = dict(MenuItem.objects.values_list('pk', 'price'))
+        menuItemIds = list(menuItemPrices)
+        today = datetime.date.today()
+        firstOrder = Order.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        lines = []
+
+        def orders():
+            for index in range(self.orders):
+                menuItemId = self.random.choice(menuItemIds)
+                quantity = self.random.randint(1, 5)
+                price = menuItemPrices[menuItemId] * quantity
+                lines.append((firstOrder + index + 1, menuItemId, quantity, menuItemPrices[menuItemId], price))
+                yield Order(
+                    id=firstOrder + index + 1,
+                    user_id=self.random.choice(customerIds),
+                    delivery_crew_id=self.random.choice(crewIds) if self.random.random() < 0.8 else None,
+                    status=self.random.random() < 0.7,
+                    total=price,
+                    date=today - datetime.timedelta(days=self.random.randint(0, 365)),
+                )
+
+        for batch in batched(orders()):
+            with transaction.atomic():
+                Order.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+                OrderItem.objects.bulk_create([
+                    OrderItem(order_id=orderId, menuitem_id=menuItemId, quantity=quantity,
+                              unit_price=unitPrice, price=price)
+                    for orderId, menuItemId, quantity, unitPrice, price in lines
+                ], batch_size=BATCH_SIZE)
+            lines.clear()
+        log('orders/order items: %d' % self.orders)
+        rebuild(today - datetime.timedelta(days=365), today)
+
+        bump_menu_generation()
+        get_search_backend().reset()
+        log('seeded in %.1fs' % (time.perf_counter() - started))
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    position = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def response_body(response):
+    if not response.streaming:
+        return response.content
+    with warnings.catch_warnings():
+        # The test client can only drain an async stream (the SSE one) whole.
+        warnings.simplefilter('ignore')
+        return b''.join(response)
+
+
+class AsyncReadURLs:
+    """URLconf serving the async_views read handlers, whatever ASYNC_READ_ROUTES says."""
+    urlpatterns = [
+        url_path('api/menu_items/', async_views.menu_items_list),
+        url_path('api/menu_items/<pk>/', async_views.menu_items_retrieve),
+        url_path('api/cart/menu-items', async_views.cart_list),
+        url_path('api/orders/', async_views.orders_list),
+        url_path('api/orders/<pk>/', async_views.orders_retrieve),
+    ]
+
+
+class Route:
+    """One endpoint call; ``prepare(iteration)`` runs untimed and returns the path.
+
+    ``overrides`` are settings applied while the route runs; ``content_type``
+    sends ``data`` as is instead of as JSON.
+    """
+
+    def __init__(self, name, method, client, prepare, data=None, overrides=None, content_type=None):
+        self.name = name
+        self.method = method
+        self.client = client
+        self.prepare = prepare
+        self.data = data
+        self.overrides = overrides or {}
+        self.content_type = content_type
+
+
+class Benchmark:
+    """Drive every LittleLemonAPI route through the test client and measure it."""
+
+    def __init__(self, iterations=50, seed=0):
+        self.iterations = iterations
+        self.random = random.Random(seed)
+
+    def client_for(self, username, group=None):
+        user, _ = User.objects.get_or_create(username=username)
+        if group is not None:
+            Group.objects.get(name=group).user_set.add(user)
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        return user, client
+
+    def routes(self):
+        manager, managerClient = self.client_for('bench_manager', MANAGER)
+        crew, crewClient = self.client_for('bench_crew', DELIVERY_CREW)
+        customer, customerClient = self.client_for('bench_customer')
+
+        menuItemIds = list(MenuItem.objects.values_list('pk', flat=True)[:1000])
+        categoryId = Category.objects.values_list('pk', flat=True).first()
+        userIds = list(User.objects.filter(username__startswith='bench_user_').values_list('pk', flat=True)[:1000])
+        pick = self.random.choice
+
+        menuItem = {'title': 'Benchmark item', 'price': '9.99', 'featured': False, 'category_id': categoryId}
+        orderIds = []
+        # A separate client, so the profiling middleware is loaded with PROFILING_ENABLED on.
+        _, profiledClient = self.client_for('bench_manager', MANAGER)
+        profiled = {'PROFILING_ENABLED': True, 'PROFILING_SAMPLE_RATE': 1.0}
+
+        importIds = menuItemIds[:100]
+        importRows = [dict(menuItem, id=menuItemId, title='Benchmark import %d' % menuItemId)
+                      for menuItemId in importIds]
+        importCsv = 'id,title,price,featured,category_id\n' + ''.join(
+            '%d,Benchmark import %d,9.99,0,%d\n' % (menuItemId, menuItemId, categoryId) for menuItemId in importIds)
+        roleUserIds = self.random.sample(userIds, min(100, len(userIds)))
+        cartBatch = [{'menuitem_id': menuItemId, 'quantity_delta': 1} for menuItemId in menuItemIds[:10]]
+        crewId = User.objects.filter(groups__name=DELIVERY_CREW, username__startswith='bench_user_') \
+            .values_list('pk', flat=True).first() or crew.pk
+        monthAgo = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
+
+        def new_menu_item(iteration):
+            return '/api/menu_items/%d/' % MenuItem.objects.create(
+                title='Benchmark delete', price=1, featured=False, category_id=categoryId).pk
+
+        def add_to_cart(iteration):
+            menuItemId = pick(menuItemIds)
+            Cart.objects.get_or_create(user=customer, menuitem_id=menuItemId,
+                                       defaults={'quantity': 1, 'unit_price': 1, 'price': 1})
+            rebuild_summaries([customer.pk])
+            return '/api/cart/menu-items'
+
+        def clear_cart_line(iteration):
+            clear_cart(customer)
+            return '/api/cart/menu-items'
+
+        def fill_cart(iteration):
+            clear_cart(customer)
+            for menuItemId in self.random.sample(menuItemIds, 3):
+                Cart.objects.create(user=customer, menuitem_id=menuItemId, quantity=2, unit_price=1, price=2)
+            rebuild_summaries([customer.pk])
+            return '/api/orders/'
+
+        def own_order_id():
+            if not orderIds:
+                orderIds.extend(Order.objects.filter(user=customer).values_list('pk', flat=True)[:100])
+            if not orderIds:
+                orderIds.append(Order.objects.create(user=customer, total=1, date=datetime.date.today()).pk)
+            return pick(orderIds)
+
+        def own_order(iteration):
+            return '/api/orders/%d/' % own_order_id()
+
+        def any_order(iteration):
+            return '/api/orders/%d/' % Order.objects.create(
+                user=customer, delivery_crew=crew, total=1, date=datetime.date.today()).pk
+
+        def member(group):
+            def prepare(iteration):
+                userId = pick(userIds)
+                Group.objects.get(name=group).user_set.add(userId)
+                return userId
+            return prepare
+
+        def cart_line(iteration):
+            menuItemId = pick(menuItemIds)
+            Cart.objects.get_or_create(user=customer, menuitem_id=menuItemId,
+                                       defaults={'quantity': 1, 'unit_price': 1, 'price': 1})
+            rebuild_summaries([customer.pk])
+            return '/api/cart/menu-items/%d' % menuItemId
+
+        def empty_cart(iteration):
+            clear_cart(customer)
+            return '/api/cart/menu-items/batch'
+
+        def managers(iteration):
+            Group.objects.get(name=MANAGER).user_set.add(*roleUserIds)
+            return '/api/groups/manager/users/bulk'
+
+        def on_shift(iteration):
+            set_off_shift(crew.pk, False)
+            return '/api/groups/delivery_crew/users/%d/shift' % crew.pk
+
+        def replay_events(iteration):
+            # A reconnecting client replaying the 20 events it missed.
+            hub = get_order_events()
+            lastId = hub.last_id()
+            order = Order.objects.get(pk=own_order_id())
+            for index in range(20):
+                hub.publish(order_event(order))
+            return '/api/orders/events?last_event_id=%d' % lastId
+
+        return [
+            Route('menu_items.list', 'get', customerClient,
+                  lambda i: '/api/menu_items/?perpage=20&page=%d' % pick(range(1, 50))),
+            Route('menu_items.list.search', 'get', customerClient,
+                  lambda i: '/api/menu_items/?perpage=20&search=%s' % pick(WORDS).lower()[:4]),
+            Route('menu_items.list.cursor', 'get', customerClient,
+                  lambda i: '/api/menu_items/?perpage=20&cursor='),
+            Route('menu_items.retrieve', 'get', customerClient,
+                  lambda i: '/api/menu_items/%d/' % pick(menuItemIds)),
+            Route('menu_items.create', 'post', managerClient, lambda i: '/api/menu_items/', menuItem),
+            Route('menu_items.update', 'put', managerClient,
+                  lambda i: '/api/menu_items/%d/' % pick(menuItemIds), menuItem),
+            Route('menu_items.partial_update', 'patch', managerClient,
+                  lambda i: '/api/menu_items/%d/' % pick(menuItemIds), menuItem),
+            Route('menu_items.destroy', 'delete', managerClient, new_menu_item),
+            Route('manager.list', 'get', managerClient, lambda i: '/api/groups/manager/users/'),
+            Route('manager.create', 'post', managerClient,
+                  lambda i: '/api/groups/manager/users/', {'id': pick(userIds)}),
+            Route('manager.destroy', 'delete', managerClient,
+                  lambda i: '/api/groups/manager/users/%d/' % member(MANAGER)(i)),
+            Route('delivery_crew.list', 'get', managerClient, lambda i: '/api/groups/delivery_crew/users/'),
+            Route('delivery_crew.create', 'post', managerClient,
+                  lambda i: '/api/groups/delivery_crew/users/', {'id': pick(userIds)}),
+            Route('delivery_crew.destroy', 'delete', managerClient,
+                  lambda i: '/api/groups/delivery_crew/users/%d/' % member(DELIVERY_CREW)(i)),
+            Route('cart.list', 'get', customerClient, add_to_cart),
+            Route('cart.create', 'post', customerClient, clear_cart_line,
+                  {'menuitem_id': pick(menuItemIds), 'quantity': 2}),
+            Route('cart.destroy', 'delete', customerClient, add_to_cart),
+            Route('orders.list.customer', 'get', customerClient, lambda i: '/api/orders/?perpage=20'),
+            Route('orders.list.manager', 'get', managerClient,
+                  lambda i: '/api/orders/?perpage=20&page=%d' % pick(range(1, 1000))),
+            Route('orders.list.crew', 'get', crewClient, lambda i: '/api/orders/?perpage=20'),
+            Route('orders.create', 'post', customerClient, fill_cart, {}),
+            Route('orders.retrieve', 'get', customerClient, own_order),
+            Route('orders.update', 'put', managerClient, any_order, {'status': True}),
+            Route('orders.partial_update', 'patch', managerClient, any_order, {'status': True}),
+            Route('orders.destroy', 'delete', managerClient, any_order),
+            Route('menu_items.list.search.filtered', 'get', customerClient,
+                  lambda i: '/api/menu_items/?perpage=20&page=2&to_price=30&search=%s' % pick(WORDS).lower()),
+            Route('menu_items.bulk.json', 'post', managerClient, lambda i: '/api/menu_items/bulk', importRows),
+            Route('menu_items.bulk.csv', 'post', managerClient, lambda i: '/api/menu_items/bulk', importCsv,
+                  content_type='text/csv'),
+            Route('manager.bulk_add', 'post', managerClient,
+                  lambda i: '/api/groups/manager/users/bulk', {'users': roleUserIds}),
+            Route('manager.bulk_remove', 'delete', managerClient, managers, {'users': roleUserIds}),
+            Route('delivery_crew.start_shift', 'post', managerClient,
+                  lambda i: '/api/groups/delivery_crew/users/%d/shift' % crew.pk),
+            Route('delivery_crew.end_shift', 'delete', managerClient, on_shift, {}),
+            Route('cart.batch', 'post', customerClient, empty_cart, cartBatch),
+            Route('cart.partial_update', 'patch', customerClient, cart_line, {'quantity': 3}),
+            Route('cart.remove_line', 'delete', customerClient, cart_line),
+            Route('orders.export.ndjson', 'get', managerClient,
+                  lambda i: '/api/orders/export?delivery_crew=%d' % crewId),
+            Route('orders.export.csv', 'get', managerClient,
+                  lambda i: '/api/orders/export?output=csv&delivery_crew=%d' % crewId),
+            Route('orders.events.replay', 'get', customerClient, replay_events,
+                  overrides={'ORDER_EVENTS_STREAM_TIMEOUT': 0}),
+            Route('reports.sales', 'get', managerClient, lambda i: '/api/reports/sales?from=%s' % monthAgo),
+            Route('reports.top_items', 'get', managerClient,
+                  lambda i: '/api/reports/top-items?limit=20&from=%s' % monthAgo),
+            Route('reports.crew', 'get', managerClient, lambda i: '/api/reports/crew?from=%s' % monthAgo),
+            Route('async.menu_items.list', 'get', customerClient,
+                  lambda i: '/api/menu_items/?perpage=20&page=%d' % pick(range(1, 50)),
+                  overrides={'ROOT_URLCONF': AsyncReadURLs}),
+            Route('async.menu_items.retrieve', 'get', customerClient,
+                  lambda i: '/api/menu_items/%d/' % pick(menuItemIds), overrides={'ROOT_URLCONF': AsyncReadURLs}),
+            Route('async.cart.list', 'get', customerClient, add_to_cart, overrides={'ROOT_URLCONF': AsyncReadURLs}),
+            Route('async.orders.list.manager', 'get', managerClient,
+                  lambda i: '/api/orders/?perpage=20&page=%d' % pick(range(1, 1000)),
+                  overrides={'ROOT_URLCONF': AsyncReadURLs}),
+            Route('async.orders.retrieve', 'get', customerClient, own_order,
+                  overrides={'ROOT_URLCONF': AsyncReadURLs}),
+            # Last, as the middleware's query hook stays installed once loaded.
+            Route('profiling.menu_items.list', 'get', profiledClient,
+                  lambda i: '/api/menu_items/?perpage=20&page=%d' % pick(range(1, 50)), overrides=profiled),
+            Route('profiling.slowest', 'get', profiledClient, lambda i: '/api/profiling/slowest', overrides=profiled),
+        ]
+
+    def run(self, only=None, log=print):
+        results = {}
+        for route in self.routes():
+            if only and not any(route.name.startswith(prefix) for prefix in only):
+                continue
+            latencies, queries, sizes, statuses = [], [], [], {}
+            encoding = {'content_type': route.content_type} if route.content_type else {'format': 'json'}
+            with override_settings(**route.overrides):
+                for iteration in range(self.iterations):
+                    path = route.prepare(iteration)
+                    request = getattr(route.client, route.method)
+                    with CaptureQueriesContext(connection) as context:
+                        started = time.perf_counter()
+                        response = request(path, route.data, **encoding)
+                        # Streamed exports and events are timed until their last byte.
+                        body = response_body(response)
+                        elapsed = time.perf_counter() - started
+                    latencies.append(elapsed * 1000)
+                    queries.append(len(context.captured_queries))
+                    sizes.append(len(body))
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            latencies.sort()
+            results[route.name] = {
+                'iterations': self.iterations,
+                'p50_ms': percentile(latencies, 0.50),
+                'p95_ms': percentile(latencies, 0.95),
+                'p99_ms': percentile(latencies, 0.99),
+                'queries_per_request': sum(queries) / len(queries),
+                'bytes_per_request': sum(sizes) / len(sizes),
+                'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+            }
+            log('%-32s p50 %8.2fms  p95 %8.2fms  p99 %8.2fms  %5.1f queries  %8.0f bytes' % (
+                route.name, results[route.name]['p50_ms'], results[route.name]['p95_ms'],
+                results[route.name]['p99_ms'], results[route.name]['queries_per_request'],
+                results[route.name]['bytes_per_request']))
+        return results
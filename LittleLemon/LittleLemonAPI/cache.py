@@ -0,0 +1,102 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import quote_etag, urlencode
+from rest_framework.renderers import JSONRenderer
+
+from .routers import primary_reads
+
+MENU_GENERATION_KEY = 'littlelemon:menu:generation'
+MENU_LIST_PARAMS = ('category', 'featured', 'to_price', 'search', 'perpage', 'page', 'cursor')
+MENU_LIST_DEFAULTS = {'perpage': '2', 'page': '1'}
+
+
+def get_cache():
+    return caches[getattr(settings, 'MENU_CACHE_ALIAS', 'default')]
+
+def first_generation():
+    # Seeded from the clock rather than 1: after the cache is flushed or
+    # restarted the counter must not come back to a value that published
+    # snapshots (which outlive the cache) were compiled for.
+    return int(time.time() * 1000)
+
+def get_menu_generation():
+    cache = get_cache()
+    generation = cache.get(MENU_GENERATION_KEY)
+    if generation is None:
+        # add() so that concurrent first readers agree on the starting value.
+        cache.add(MENU_GENERATION_KEY, first_generation(), timeout=None)
+        generation = cache.get(MENU_GENERATION_KEY)
+    return generation
+
+def bump_menu_generation():
+    """Invalidate every cached menu response by moving to a new generation.
+
+    Old entries are never deleted explicitly, they simply stop being
+    addressed and age out of the cache through the normal timeout.
+    """
+    cache = get_cache()
+    try:
+        return cache.incr(MENU_GENERATION_KEY)
+    except ValueError:
+        cache.add(MENU_GENERATION_KEY, first_generation(), timeout=None)
+        return cache.incr(MENU_GENERATION_KEY)
+
+def normalize_menu_params(query_params, names=MENU_LIST_PARAMS, defaults=MENU_LIST_DEFAULTS):
+    params = []
+    for name in names:
+        value = query_params.get(name, defaults.get(name, ''))
+        params.append((name, str(value).strip()))
+    return params
+
+def menu_list_version(query_params, prefix='list'):
+    """Identify one menu response: the mode, menu generation and params.
+
+    It changes whenever the menu is written to, which makes it the cache
+    key suffix. It is not an ETag: see ``content_etag()``.
+    """
+    params = urlencode(normalize_menu_params(query_params))
+    digest = hashlib.md5(params.encode('utf-8')).hexdigest()
+    return '%s-%s-%s' % (prefix, get_menu_generation(), digest)
+
+def menu_list_cache_key(version):
+    return 'littlelemon:menu:%s' % version
+
+def content_etag(data):
+    """A strong ETag digested from the response data itself.
+
+    Unlike the generation it names the content, so every worker and every
+    restart agree on it, and it only changes when the data does.
+    """
+    return quote_etag('l-' + hashlib.md5(JSONRenderer().render(data)).hexdigest())
+
+def cached_menu_response(version, build):
+    """Return ``(etag, data)`` for a menu request, calling ``build()`` on a miss.
+
+    ``build()`` reads from the primary: the version names the newest menu
+    generation, and rows from a lagging replica would be cached under it.
+    The ETag is computed once, on the fill, and cached with the data.
+    """
+    cache = get_cache()
+    key = menu_list_cache_key(version)
+    entry = cache.get(key)
+    if entry is None:
+        with primary_reads():
+            data = build()
+        entry = (content_etag(data), data)
+        cache.set(key, entry, getattr(settings, 'MENU_CACHE_TIMEOUT', 300))
+    return entry
+
+async def acached_menu_response(version, build):
+    """``cached_menu_response()`` for async views; ``build`` is a coroutine function."""
+    cache = get_cache()
+    key = menu_list_cache_key(version)
+    entry = await cache.aget(key)
+    if entry is None:
+        with primary_reads():
+            data = await build()
+        entry = (content_etag(data), data)
+        await cache.aset(key, entry, getattr(settings, 'MENU_CACHE_TIMEOUT', 300))
+    return entry
@@ -0,0 +1,169 @@
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import F, Sum, DecimalField, ExpressionWrapper
+
+from .models import Cart, CartSummary, MenuItem
+
+MAX_QUANTITY = 32767
+MAX_PRICE = Decimal('9999.99')
+
+
+def lock_summary(user):
+    """Return ``user``'s CartSummary row, created if needed and locked.
+
+    Every cart write locks the summary before touching Cart rows, so cart
+    writers and checkout always take their locks in the same order.
+    """
+    CartSummary.objects.get_or_create(user=user)
+    return CartSummary.objects.select_for_update().get(user=user)
+
+def change_summary(user, item_count, subtotal):
+    updated = CartSummary.objects.filter(user=user).update(
+        item_count=F('item_count') + item_count,
+        subtotal=F('subtotal') + subtotal,
+    )
+    if not updated:
+        CartSummary.objects.get_or_create(user=user)
+        change_summary(user, item_count, subtotal)
+
+def add_to_cart(serialized_cart, user, menuitem):
+    """Save a validated CartSerializer line and count it in the summary."""
+    quantity = serialized_cart.validated_data['quantity']
+    price = menuitem.price * quantity
+    with transaction.atomic():
+        change_summary(user, quantity, price)
+        return serialized_cart.save(
+            user = user,
+            unit_price = menuitem.price,
+            price = price
+        )
+
+@transaction.atomic
+def clear_cart(user):
+    lock_summary(user)
+    Cart.objects.filter(user=user).delete()
+    CartSummary.objects.filter(user=user).update(item_count=0, subtotal=0)
+
+def rebuild_summaries(user_ids):
+    """Recompute the summaries of ``user_ids`` from their Cart rows."""
+    totals = {
+        row['user']: row
+        for row in Cart.objects.filter(user__in=user_ids).values('user')
+            .annotate(item_count=Sum('quantity'), subtotal=Sum('price'))
+    }
+    for user_id in user_ids:
+        row = totals.get(user_id, {'item_count': 0, 'subtotal': 0})
+        CartSummary.objects.update_or_create(
+            user_id=user_id,
+            defaults={'item_count': row['item_count'] or 0, 'subtotal': row['subtotal'] or 0},
+        )
+
+@transaction.atomic
+def reprice_menu_item(menuItem):
+    """Move open cart lines of ``menuItem`` to its current price."""
+    stale = Cart.objects.filter(menuitem=menuItem).exclude(unit_price=menuItem.price)
+    user_ids = sorted(set(stale.values_list('user_id', flat=True)))
+    if not user_ids:
+        return
+    # Summaries before cart rows, like every other cart writer.
+    list(CartSummary.objects.select_for_update().filter(user__in=user_ids).order_by('user'))
+    Cart.objects.filter(menuitem=menuItem).update(
+        unit_price=menuItem.price,
+        price=ExpressionWrapper(F('quantity') * menuItem.price,
+                                output_field=DecimalField(max_digits=6, decimal_places=2)),
+    )
+    rebuild_summaries(user_ids)
+
+
+class CartError(Exception):
+
+    def __init__(self, errors):
+        super().__init__('%d invalid cart changes' % len(errors))
+        self.errors = errors
+
+class CartLineMissing(CartError):
+    pass
+
+def save_lines(lines, existing):
+    """Write ``lines``, updating the ones in ``existing`` and adding the rest.
+
+    Backends that can name the conflict target get one INSERT ... ON
+    CONFLICT; MySQL cannot, so it gets a bulk UPDATE of the lines that were
+    read and locked plus a bulk INSERT of the new ones. The summary lock
+    keeps any other writer from adding the same lines meanwhile.
+    """
+    fields = ['quantity', 'unit_price', 'price']
+    if connections[router.db_for_write(Cart)].features.supports_update_conflicts_with_target:
+        Cart.objects.bulk_create(lines, update_conflicts=True, unique_fields=['menuitem', 'user'],
+                                 update_fields=fields)
+        return
+    updated = []
+    for line in lines:
+        if line.menuitem_id in existing:
+            line.pk = existing[line.menuitem_id].pk
+            updated.append(line)
+    if updated:
+        Cart.objects.bulk_update(updated, fields)
+    Cart.objects.bulk_create([line for line in lines if line.pk is None])
+
+@transaction.atomic
+def change_cart(user, changes, relative=True, require_existing=False):
+    """Apply ``{menuitem_id: quantity}`` changes to ``user``'s cart at once.
+
+    With ``relative`` the numbers are added to the current quantities,
+    otherwise they replace them. Lines that end at zero or below are
+    removed; the rest are written with one upsert on the (menuitem, user)
+    key at the current menu prices, looked up with a single IN query. The
+    summary moves by the difference. Returns ``(lines, removed ids,
+    summary)``.
+    """
+    summary = lock_summary(user)
+    menuItems = MenuItem.objects.select_related('category').in_bulk(list(changes))
+    existing = {
+        line.menuitem_id: line
+        for line in Cart.objects.select_for_update().filter(user=user, menuitem__in=list(changes))
+    }
+
+    errors = []
+    for menuitem_id in sorted(changes):
+        if menuitem_id not in menuItems:
+            errors.append({'menuitem_id': menuitem_id, 'errors': ['Menuitem_Id invalid']})
+    if require_existing:
+        missing = sorted(set(changes) - set(existing))
+        if missing:
+            raise CartLineMissing([{'menuitem_id': menuitem_id, 'errors': ['Not in cart']} for menuitem_id in missing])
+
+    lines, removed = [], []
+    item_count, subtotal = 0, 0
+    for menuitem_id in sorted(changes):
+        menuItem = menuItems.get(menuitem_id)
+        if menuItem is None:
+            continue
+        line = existing.get(menuitem_id)
+        quantity = (line.quantity if line and relative else 0) + changes[menuitem_id]
+        if quantity > MAX_QUANTITY or quantity * menuItem.price > MAX_PRICE:
+            errors.append({'menuitem_id': menuitem_id, 'errors': ['Quantity too large']})
+            continue
+        if line:
+            item_count -= line.quantity
+            subtotal -= line.price
+        if quantity <= 0:
+            if line:
+                removed.append(menuitem_id)
+            continue
+        price = menuItem.price * quantity
+        item_count += quantity
+        subtotal += price
+        lines.append(Cart(user=user, menuitem=menuItem, quantity=quantity, unit_price=menuItem.price, price=price))
+    if errors:
+        raise CartError(sorted(errors, key=lambda error: error['menuitem_id']))
+
+    save_lines(lines, existing)
+    if removed:
+        Cart.objects.filter(user=user, menuitem__in=removed).delete()
+    # The summary row is locked, so its new totals can be written outright.
+    summary.item_count += item_count
+    summary.subtotal += subtotal
+    CartSummary.objects.filter(user=user).update(item_count=summary.item_count, subtotal=summary.subtotal)
+    return lines, removed, summary
@@ -0,0 +1,53 @@
+import datetime
+
+from django.db import transaction
+
+from .models import Cart, CartSummary, Order, OrderItem
+from .carts import lock_summary
+from .rollups import record_order
+from .assignment import pick_crew, move_open_orders
+
+
+@transaction.atomic
+def checkout(user):
+    """Turn ``user``'s cart into an Order and return ``(order, order_items)``.
+
+    The cart summary and cart rows are locked for the duration of the
+    transaction so a concurrent checkout or cart write cannot slip in
+    between reading and deleting them. The order total comes from the
+    summary, and the number of queries does not depend on the cart size:
+    lock the summary, lock and read the lines, insert the order, bulk
+    insert the items, update the sales rollups, delete the cart and reset
+    the summary. The order goes to the least-loaded on-shift crew member,
+    which normally costs one small query for who is off shift.
+    """
+    summary = lock_summary(user)
+    cart = Cart.objects.filter(user=user)
+    lines = list(
+        cart.select_for_update(of=('self',))
+        .select_related('menuitem__category')
+        .order_by('id')
+    )
+
+    crewId = pick_crew()
+    order = Order.objects.create(
+        user = user,
+        delivery_crew_id = crewId,
+        total = summary.subtotal,
+        date = datetime.date.today()
+    )
+    move_open_orders(None, crewId)
+    orderItems = OrderItem.objects.bulk_create([
+        OrderItem(
+            order = order,
+            menuitem = line.menuitem,
+            quantity = line.quantity,
+            unit_price = line.unit_price,
+            price = line.price
+        )
+        for line in lines
+    ])
+    record_order(order, orderItems)
+    cart.delete()
+    CartSummary.objects.filter(user=user).update(item_count=0, subtotal=0)
+    return order, orderItems
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PER_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+
+def is_shared(alias):
+    """Whether the cache ``alias`` is seen by every worker, not just this process."""
+    return not isinstance(caches[alias], PER_PROCESS_CACHES)
+
+
+@checks.register(checks.Tags.caches)
+def check_menu_cache(app_configs, **kwargs):
+    # A menu write bumps the generation in this cache; on a per-process one
+    # the other workers never see the bump and serve their pages forever.
+    alias = getattr(settings, 'MENU_CACHE_ALIAS', 'default')
+    if not is_shared(alias):
+        return [checks.Error(
+            "The menu cache '%s' is per-process, so menu writes would not invalidate "
+            "the other workers' cached pages." % alias,
+            hint='Point MENU_CACHE_ALIAS at a shared cache such as Redis, Memcached or FileBasedCache.',
+            id='LittleLemonAPI.E003',
+        )]
+    return []
+
+
+@checks.register(checks.Tags.caches)
+def check_snapshot_store(app_configs, **kwargs):
+    # Both stores accept a snapshot only for the current menu generation,
+    # which every worker must read from the same counter.
+    alias = getattr(settings, 'MENU_CACHE_ALIAS', 'default')
+    if getattr(settings, 'MENU_SNAPSHOT_STORE', None) and not is_shared(alias):
+        return [checks.Error(
+            "MENU_SNAPSHOT_STORE needs the menu cache shared by every worker, but the "
+            "'%s' cache is per-process." % alias,
+            hint='Set MENU_SNAPSHOT_STORE to None, or point MENU_CACHE_ALIAS at a shared '
+                 'cache such as Redis, Memcached or FileBasedCache.',
+            id='LittleLemonAPI.E001',
+        )]
+    return []
+
+
+@checks.register(checks.Tags.caches)
+def check_auth_caches(app_configs, **kwargs):
+    enabled = [name for name in ('ROLE_CACHE_TIMEOUT', 'TOKEN_CACHE_TIMEOUT') if getattr(settings, name, 0)]
+    if enabled and not is_shared('default'):
+        return [checks.Error(
+            '%s enabled on a per-process default cache: other workers would keep '
+            'serving revoked tokens and stale roles until the entries expire.' % ' and '.join(enabled),
+            hint='Set them to 0, or configure CACHES["default"] as a shared cache.',
+            id='LittleLemonAPI.E002',
+        )]
+    return []
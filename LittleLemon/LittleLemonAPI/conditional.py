@@ -0,0 +1,28 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def row_etag(pk, updated_at):
+    return quote_etag('%s-%d' % (pk, updated_at.timestamp() * 1000000))
+
+
+class ConditionalGetMixin:
+    """ETag / Last-Modified handling for ViewSet read actions.
+
+    Views compute their validators from something cheap (the digest cached
+    with a menu list, a row's ``updated_at``) before serializing, call
+    ``not_modified()`` and return its 304 when the client is up to date,
+    then pass the real response through ``with_validators()``.
+    """
+
+    def not_modified(self, request, etag=None, last_modified=None):
+        # HTTP dates have one second resolution.
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    def with_validators(self, response, etag=None, last_modified=None):
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .roles import MANAGER, DELIVERY_CREW
+
+
+def replay_size():
+    return getattr(settings, 'ORDER_EVENTS_REPLAY', 1000)
+
+
+class LocalOrderEvents:
+    """In-process hub: a numbered replay log plus wake-ups for waiting streams.
+
+    Publishing happens on request threads and waiting on event loops, so
+    waiters are woken with ``call_soon_threadsafe``. Only streams served by
+    the same process see the events.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.log = deque(maxlen=replay_size())
+        self.last = 0
+        self.waiters = set()
+
+    def publish(self, event):
+        with self.lock:
+            self.last += 1
+            event = dict(event, id=self.last)
+            self.log.append(event)
+            waiters = list(self.waiters)
+        for loop, woken in waiters:
+            loop.call_soon_threadsafe(woken.set)
+        return event
+
+    def last_id(self):
+        return self.last
+
+    def events_after(self, last_id):
+        """Events after ``last_id``, or None if some have left the replay log."""
+        with self.lock:
+            if last_id == self.last:
+                return []
+            # Ids from the future come from before a restart.
+            if last_id > self.last or not self.log or last_id < self.log[0]['id'] - 1:
+                return None
+            return [event for event in self.log if event['id'] > last_id]
+
+    async def wait(self, last_id, timeout):
+        """Events after ``last_id`` as soon as there are any, [] on timeout."""
+        woken = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), woken)
+        with self.lock:
+            self.waiters.add(waiter)
+        try:
+            events = self.events_after(last_id)
+            if events == []:
+                try:
+                    await asyncio.wait_for(woken.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return []
+                events = self.events_after(last_id)
+            return events
+        finally:
+            with self.lock:
+                self.waiters.discard(waiter)
+
+
+class CacheOrderEvents:
+    """Hub kept in the Django cache, so every worker sharing it sees every event.
+
+    Events are numbered with ``cache.incr`` and stored one key each for
+    ``ORDER_EVENTS_TTL`` seconds; waiting streams poll the counter every
+    ``ORDER_EVENTS_POLL`` seconds, one cache read per stream.
+    """
+    prefix = 'littlelemon:order-events:'
+
+    def key(self, event_id):
+        return '%s%d' % (self.prefix, event_id)
+
+    def publish(self, event):
+        try:
+            event_id = cache.incr(self.prefix + 'last')
+        except ValueError:
+            cache.add(self.prefix + 'last', 0, None)
+            event_id = cache.incr(self.prefix + 'last')
+        event = dict(event, id=event_id)
+        cache.set(self.key(event_id), event, getattr(settings, 'ORDER_EVENTS_TTL', 3600))
+        return event
+
+    def last_id(self):
+        return cache.get(self.prefix + 'last', 0)
+
+    def keys_between(self, last_id, newest):
+        if last_id > newest or newest - last_id > replay_size():
+            return None
+        return [self.key(event_id) for event_id in range(last_id + 1, newest + 1)]
+
+    def found(self, keys, stored):
+        # A key that expired or was evicted is a gap in the replay.
+        if keys is None or len(stored) != len(keys):
+            return None
+        return [stored[key] for key in keys]
+
+    def events_after(self, last_id):
+        keys = self.keys_between(last_id, self.last_id())
+        return self.found(keys, cache.get_many(keys or []))
+
+    async def wait(self, last_id, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            newest = await cache.aget(self.prefix + 'last', 0)
+            if newest != last_id:
+                keys = self.keys_between(last_id, newest)
+                return self.found(keys, await cache.aget_many(keys or []))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            await asyncio.sleep(min(getattr(settings, 'ORDER_EVENTS_POLL', 1), remaining))
+
+
+order_events = None
+
+def get_order_events():
+    global order_events
+    if order_events is None:
+        path = getattr(settings, 'ORDER_EVENTS_BACKEND', None)
+        order_events = import_string(path)() if path else LocalOrderEvents()
+    return order_events
+
+
+def order_event(order, previous_crew=None):
+    return {
+        'order': order.pk,
+        'user': order.user_id,
+        'status': bool(order.status),
+        'delivery_crew': order.delivery_crew_id,
+        'previous_delivery_crew': previous_crew,
+    }
+
+def publish_order_change(event):
+    """Publish ``event`` once the current transaction commits."""
+    transaction.on_commit(lambda: get_order_events().publish(event))
+
+@contextmanager
+def announcing_changes(order):
+    """Publish the order's status or delivery crew if an update changes them.
+
+        with announcing_changes(order):
+            serialized_order.save()
+    """
+    before = (bool(order.status), order.delivery_crew_id)
+    yield
+    if (bool(order.status), order.delivery_crew_id) != before:
+        publish_order_change(order_event(order, previous_crew=before[1]))
+
+def can_see(event, user_id, roles):
+    if MANAGER in roles:
+        return True
+    if DELIVERY_CREW in roles:
+        return user_id in (event['delivery_crew'], event['previous_delivery_crew'])
+    return event['user'] == user_id
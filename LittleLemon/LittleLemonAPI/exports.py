@@ -0,0 +1,72 @@
+import csv
+import json
+
+from django.db.models import prefetch_related_objects
+
+from .pagination import KeysetPaginator
+from .readers import price, date
+
+CSV_HEADER = ['order_id', 'user_id', 'username', 'delivery_crew_id', 'delivery_crew', 'status',
+              'total', 'date', 'menuitem_id', 'menuitem', 'quantity', 'unit_price', 'price']
+
+
+def iter_orders(orders, chunk_size=2000):
+    """Yield orders with their items, one keyset-paginated chunk at a time.
+
+    Each chunk is a bounded range scan on the primary key plus one query
+    for its items, so memory stays flat however many orders match. Unlike
+    ``QuerySet.iterator()`` this does not rely on server-side cursors,
+    which the MySQL driver does not provide.
+    """
+    paginator = KeysetPaginator(orders.select_related('user', 'delivery_crew'), ['id'], chunk_size)
+    cursor = None
+    while True:
+        rows, cursor = paginator.page(cursor)
+        prefetch_related_objects(rows, 'orderitem_set__menuitem')
+        yield from rows
+        if cursor is None:
+            return
+
+def order_items(order):
+    return sorted(order.orderitem_set.all(), key=lambda item: item.pk)
+
+def ndjson_rows(orders):
+    for order in iter_orders(orders):
+        crew = order.delivery_crew
+        yield json.dumps({
+            'id': order.pk,
+            'user': {'id': order.user.pk, 'username': order.user.username},
+            'delivery_crew': {'id': crew.pk, 'username': crew.username} if crew else None,
+            'status': order.status,
+            'total': price(order.total),
+            'date': date(order.date),
+            'items': [{
+                'menuitem_id': item.menuitem_id,
+                'menuitem': item.menuitem.title,
+                'quantity': item.quantity,
+                'unit_price': price(item.unit_price),
+                'price': price(item.price),
+            } for item in order_items(order)],
+        }) + '\n'
+
+
+class Echo:
+    """File-like object that hands csv.writer's output straight back."""
+
+    def write(self, value):
+        return value
+
+def csv_rows(orders):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for order in iter_orders(orders):
+        crew = order.delivery_crew
+        head = [order.pk, order.user.pk, order.user.username,
+                crew.pk if crew else '', crew.username if crew else '',
+                order.status, price(order.total), date(order.date)]
+        items = order_items(order)
+        if not items:
+            yield writer.writerow(head + [''] * 5)
+        for item in items:
+            yield writer.writerow(head + [item.menuitem_id, item.menuitem.title, item.quantity,
+                                          price(item.unit_price), price(item.price)])
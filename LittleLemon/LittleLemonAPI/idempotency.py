@@ -0,0 +1,82 @@
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+
+
+def fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = sorted(data.lists())
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+def replay(stored, requestFingerprint):
+    if stored['fingerprint'] != requestFingerprint:
+        return Response({'message':'Idempotency-Key was already used for a different request'},
+                        status.HTTP_422_UNPROCESSABLE_ENTITY)
+    response = Response(stored['data'], stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(action):
+    """Make a ViewSet write action safe to retry with an ``Idempotency-Key``.
+
+    The first request with a given key (per user and action) runs the
+    action and its response is kept for ``IDEMPOTENCY_TTL`` seconds;
+    retries get that response back without running anything. A duplicate
+    that arrives while the first is still running waits up to
+    ``IDEMPOTENCY_WAIT`` seconds for its response, then gets 409.
+    Server errors are not stored, so those can be retried for real. Reusing
+    a key with a different body is answered with 422. Requests without the
+    header are not affected.
+    """
+    @functools.wraps(action)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return action(self, request, *args, **kwargs)
+        if not key or len(key) > 255:
+            return Response({'message':'Invalid Idempotency-Key'}, status.HTTP_400_BAD_REQUEST)
+
+        scope = hashlib.sha256(('%s:%s.%s:%s' % (
+            request.user.pk, type(self).__name__, action.__name__, key)).encode()).hexdigest()
+        responseKey = 'littlelemon:idempotency:%s' % scope
+        lockKey = responseKey + ':lock'
+        requestFingerprint = fingerprint(request)
+
+        deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT', 10)
+        while True:
+            stored = cache.get(responseKey)
+            if stored is not None:
+                return replay(stored, requestFingerprint)
+            if cache.add(lockKey, requestFingerprint, getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 30)):
+                break
+            if time.monotonic() >= deadline:
+                return Response({'message':'A request with this Idempotency-Key is still in progress'},
+                                status.HTTP_409_CONFLICT)
+            time.sleep(0.05)
+
+        try:
+            # It may have finished between our last look and taking the lock.
+            stored = cache.get(responseKey)
+            if stored is not None:
+                return replay(stored, requestFingerprint)
+            response = action(self, request, *args, **kwargs)
+            if response.status_code < 500:
+                cache.set(responseKey, {
+                    'fingerprint': requestFingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                }, getattr(settings, 'IDEMPOTENCY_TTL', 86400))
+            return response
+        finally:
+            cache.delete(lockKey)
+    return wrapper
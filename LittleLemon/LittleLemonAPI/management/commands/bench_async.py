@@ -0,0 +1,63 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, AsyncRequestFactory
+
+from LittleLemonAPI import async_views, views
+from LittleLemonAPI.benchmark import Benchmark
+from LittleLemonAPI.roles import MANAGER
+
+ROUTES = {
+    'menu_items': (views.MenuItemView.as_view({'get':'list'}), async_views.menu_items_list, '/api/menu_items/'),
+    'orders': (views.OrdersView.as_view({'get':'list'}), async_views.orders_list, '/api/orders/'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare requests per second of the sync and async read views under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route', choices=sorted(ROUTES), default='menu_items')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=32)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Refusing to benchmark against a %s database; run with '
+                               'DJANGO_SETTINGS_MODULE=LittleLemon.settings_benchmark' % connection.vendor)
+        syncView, asyncView, path = ROUTES[options['route']]
+        user, client = Benchmark().client_for('bench_manager', MANAGER)
+        headers = {'Authorization': client._credentials['HTTP_AUTHORIZATION']}
+        # Different pages so the menu cache only helps as much as it would live.
+        paths = ['%s?page=%d&perpage=20' % (path, index % 50 + 1) for index in range(options['requests'])]
+
+        def sync_call(path):
+            response = syncView(RequestFactory().get(path, headers=headers))
+            response.render()
+            return response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            statuses = list(pool.map(sync_call, paths))
+        self.report('sync', statuses, time.perf_counter() - started)
+
+        async def run_async():
+            semaphore = asyncio.Semaphore(options['concurrency'])
+
+            async def async_call(path):
+                async with semaphore:
+                    response = await asyncView(AsyncRequestFactory().get(path, headers=headers))
+                    return response.status_code
+            return await asyncio.gather(*[async_call(path) for path in paths])
+
+        started = time.perf_counter()
+        statuses = asyncio.run(run_async())
+        self.report('async', statuses, time.perf_counter() - started)
+
+    def report(self, name, statuses, elapsed):
+        failed = sum(1 for status in statuses if status != 200)
+        self.stdout.write('%-6s %8.1f req/s %6d requests %4d failed' % (
+            name, len(statuses) / elapsed, len(statuses), failed))
@@ -0,0 +1,66 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from LittleLemonAPI.models import Category, MenuItem
+from LittleLemonAPI.search import get_search_backend
+from LittleLemonAPI.views import MenuItemView
+
+WORDS = ['lemon', 'chicken', 'greek', 'salad', 'bruschetta', 'pasta', 'grilled',
+         'fish', 'lamb', 'souvlaki', 'cake', 'baklava', 'spicy', 'garlic', 'feta',
+         'olive', 'tomato', 'basil', 'honey', 'orange', 'mint', 'yogurt', 'pita']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark menu search through the list endpoint\'s query path at growing menu sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,5000,20000')
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--perpage', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Refusing to write benchmark rows to a %s database; run with '
+                               'DJANGO_SETTINGS_MODULE=LittleLemon.settings_benchmark' % connection.vendor)
+        rng = random.Random(0)
+        queries = [rng.choice(WORDS)[:rng.randint(2, 5)] for _ in range(options['queries'])]
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        factory = APIRequestFactory()
+        view = MenuItemView()
+        self.stdout.write('%10s %12s %12s %12s' % ('items', 'index ms', 'page p50 ms', 'page max ms'))
+
+        # The rows only exist for the run: everything is rolled back at the end.
+        with transaction.atomic():
+            category = Category.objects.create(slug='bench-search', title='Bench search')
+            for size in [int(size) for size in options['sizes'].split(',')]:
+                missing = size - MenuItem.objects.count()
+                MenuItem.objects.bulk_create([
+                    MenuItem(title='%s %s %s' % (rng.choice(WORDS), rng.choice(WORDS),
+                                                 ''.join(rng.choice(letters) for _ in range(8))),
+                             price=1, featured=False, category=category)
+                    for _ in range(max(0, missing))
+                ], batch_size=5000)
+                backend = get_search_backend()
+                backend.reset()
+                started = time.perf_counter()
+                backend.filter(MenuItem.objects.all(), 'warm')
+                built = time.perf_counter() - started
+
+                # build_list is what a cache miss runs: filters, search, page query.
+                timings = []
+                for query in queries:
+                    request = Request(factory.get('/api/menu_items/', {
+                        'search': query, 'perpage': options['perpage'], 'page': 1}))
+                    started = time.perf_counter()
+                    view.build_list(request)
+                    timings.append(time.perf_counter() - started)
+                timings.sort()
+                self.stdout.write('%10d %12.1f %12.2f %12.2f' % (
+                    size, built * 1000, timings[len(timings) // 2] * 1000, timings[-1] * 1000))
+            transaction.set_rollback(True)
+        get_search_backend().reset()
@@ -0,0 +1,39 @@
+import datetime
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from LittleLemonAPI.benchmark import Benchmark
+
+
+class Command(BaseCommand):
+    help = 'Measure latency, queries and response size of every LittleLemonAPI route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--only', action='append', help='Route name prefix, e.g. menu_items or orders.list')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Refusing to benchmark against a %s database; run with '
+                               'DJANGO_SETTINGS_MODULE=LittleLemon.settings_benchmark' % connection.vendor)
+        results = Benchmark(iterations=options['iterations'], seed=options['seed']).run(
+            only=options['only'], log=self.stdout.write)
+
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+        except OSError:
+            commit = ''
+        report = {
+            'commit': commit or None,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'iterations': options['iterations'],
+            'routes': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write('Wrote %s' % options['output'])
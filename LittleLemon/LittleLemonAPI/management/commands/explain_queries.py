@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI.models import Order
+from LittleLemonAPI.query_audit import analyze, audit
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the list endpoints\' queries and fail if any of them scans a whole table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', help='Query name prefix, e.g. orders or menu_items.list')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Refresh the planner statistics first (ANALYZE, or ANALYZE TABLE on MySQL)')
+        parser.add_argument('--plans', action='store_true', help='Print every plan, not just failing ones')
+
+    def handle(self, *args, **options):
+        if not Order.objects.exists():
+            raise CommandError('No orders to plan against; seed the database first with seed_benchmark')
+        if options['analyze']:
+            analyze()
+
+        failed = []
+        for name, plan, scans in audit(options['only']):
+            if scans:
+                failed.append(name)
+                self.stdout.write('%-36s FULL SCAN of %s' % (name, ', '.join(scans)))
+            else:
+                self.stdout.write('%-36s ok' % name)
+            if scans or options['plans']:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+        if failed:
+            raise CommandError('%d queries scan a whole table: %s' % (len(failed), ', '.join(failed)))
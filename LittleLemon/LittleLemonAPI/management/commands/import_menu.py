@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI.menu_import import parse_rows, import_menu_items, MenuImportError
+
+
+class Command(BaseCommand):
+    help = 'Create or update menu items in bulk from a JSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['json', 'csv'],
+                            help='Defaults to the file extension')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        content_type = options['format'] or ('csv' if path.endswith('.csv') else 'json')
+        try:
+            with open(path, encoding='utf-8-sig') as source:
+                rows = parse_rows(source.read(), content_type)
+        except (OSError, ValueError) as error:
+            raise CommandError('Cannot read %s: %s' % (path, error))
+        try:
+            created, updated = import_menu_items(rows)
+        except MenuImportError as error:
+            for rowError in error.errors:
+                self.stderr.write('row %d: %s' % (rowError['row'], dict(rowError['errors'])))
+            raise CommandError('Import aborted, nothing was written')
+        self.stdout.write('Created %d and updated %d menu items' % (created, updated))
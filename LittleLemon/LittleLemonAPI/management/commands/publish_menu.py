@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI.snapshots import publish_menu
+
+
+class Command(BaseCommand):
+    help = 'Precompile the menu list pages and publish them to MENU_SNAPSHOT_STORE'
+
+    def handle(self, *args, **options):
+        snapshot = publish_menu()
+        if snapshot is None:
+            raise CommandError('MENU_SNAPSHOT_STORE is not set')
+        self.stdout.write('Published %d pages at generation %s (%s)' % (
+            len(snapshot.blobs), snapshot.generation, snapshot.hash[:16]))
@@ -0,0 +1,32 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min, Max
+
+from LittleLemonAPI.models import Order
+from LittleLemonAPI.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups from order history, a batch of days at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=datetime.date.fromisoformat)
+        parser.add_argument('--end', type=datetime.date.fromisoformat)
+        parser.add_argument('--batch-days', type=int, default=30)
+
+    def handle(self, *args, **options):
+        bounds = Order.objects.aggregate(first=Min('date'), last=Max('date'))
+        start = options['start'] or bounds['first']
+        end = options['end'] or bounds['last']
+        if start is None or end is None:
+            self.stdout.write('No orders to roll up')
+            return
+
+        step = datetime.timedelta(days=options['batch_days'])
+        batchStart = start
+        while batchStart <= end:
+            batchEnd = min(batchStart + step - datetime.timedelta(days=1), end)
+            rebuild(batchStart, batchEnd)
+            self.stdout.write('Rolled up %s to %s' % (batchStart, batchEnd))
+            batchStart = batchEnd + datetime.timedelta(days=1)
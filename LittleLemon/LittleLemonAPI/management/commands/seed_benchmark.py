@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from LittleLemonAPI.benchmark import Seeder
+
+
+class Command(BaseCommand):
+    help = 'Bulk-seed benchmark volumes of menu items, users and orders into a SQLite database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu-items', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--orders', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Refusing to seed a %s database; run with '
+                               'DJANGO_SETTINGS_MODULE=LittleLemon.settings_benchmark' % connection.vendor)
+        Seeder(
+            menu_items=options['menu_items'],
+            users=options['users'],
+            orders=options['orders'],
+            seed=options['seed'],
+        ).run(log=self.stdout.write)
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Category, MenuItem
+from .cache import bump_menu_generation
+from .carts import reprice_menu_item
+from .search import get_search_backend
+from .snapshots import schedule_publish
+
+BATCH_SIZE = 500
+FIELDS = ['title', 'price', 'featured', 'category_id']
+
+
+class MenuItemImportSerializer(serializers.ModelSerializer):
+    """Per-row validation without MenuItemSerializer's per-row category query."""
+    id = serializers.IntegerField(required=False)
+    category_id = serializers.IntegerField()
+
+    class Meta:
+        model = MenuItem
+        fields = ['id'] + FIELDS
+
+
+def parse_rows(text, content_type='json'):
+    """Row dicts from CSV or JSON text; raises ValueError if it is neither."""
+    if content_type == 'csv':
+        # A blank cell is a missing value, e.g. the id of a row to create.
+        return [{field: value for field, value in row.items() if value != ''}
+                for row in csv.DictReader(io.StringIO(text))]
+    return menu_rows(json.loads(text))
+
+def menu_rows(data):
+    """The rows of a parsed JSON upload: a list, or ``{"items": [...]}``."""
+    rows = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(rows, list):
+        raise ValueError('Expected a list of menu items or {"items": [...]}')
+    return rows
+
+
+class MenuImportError(Exception):
+
+    def __init__(self, errors):
+        super().__init__('%d invalid rows' % len(errors))
+        self.errors = errors
+
+
+@transaction.atomic
+def import_menu_items(rows):
+    """Create or update menu items from a batch of row dicts, all or nothing.
+
+    Rows with an ``id`` update that item, the others are created. Category
+    ids and existing items are each checked with a single ``IN`` query and
+    the writes go through ``bulk_create``/``bulk_update``. Any invalid row
+    raises MenuImportError with the errors of every row and writes nothing.
+    Returns ``(created, updated)`` counts.
+    """
+    errors, valid = [], []
+    for index, row in enumerate(rows):
+        serialized_row = MenuItemImportSerializer(data=row)
+        if serialized_row.is_valid():
+            valid.append((index, serialized_row.validated_data))
+        else:
+            errors.append({'row': index, 'errors': serialized_row.errors})
+
+    categoryIds = set(Category.objects.filter(
+        pk__in={data['category_id'] for index, data in valid}).values_list('pk', flat=True))
+    existing = MenuItem.objects.in_bulk([data['id'] for index, data in valid if 'id' in data])
+    for index, data in valid:
+        if data['category_id'] not in categoryIds:
+            errors.append({'row': index, 'errors': {'category_id': ['Category_Id invalid']}})
+        elif 'id' in data and data['id'] not in existing:
+            errors.append({'row': index, 'errors': {'id': ['Menuitem_Id invalid']}})
+    if errors:
+        raise MenuImportError(sorted(errors, key=lambda error: error['row']))
+
+    now = timezone.now()
+    created, updated, repriced = [], [], []
+    for index, data in valid:
+        if 'id' in data:
+            menuItem = existing[data['id']]
+            if menuItem.price != data['price']:
+                repriced.append(menuItem)
+            for field in FIELDS:
+                setattr(menuItem, field, data[field])
+            # bulk_update() skips auto_now, so keep the ETag validator moving.
+            menuItem.updated_at = now
+            updated.append(menuItem)
+        else:
+            created.append(MenuItem(**data))
+
+    MenuItem.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    MenuItem.objects.bulk_update(updated, FIELDS + ['updated_at'], batch_size=BATCH_SIZE)
+
+    # bulk writes bypass the MenuItem signals, so do their work once here.
+    for menuItem in repriced:
+        reprice_menu_item(menuItem)
+    transaction.on_commit(bump_menu_generation)
+    schedule_publish()
+    transaction.on_commit(get_search_backend().reset)
+    return len(created), len(updated)
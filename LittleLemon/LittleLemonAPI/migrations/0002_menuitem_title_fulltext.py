@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    MenuItem = apps.get_model('LittleLemonAPI', 'MenuItem')
+    quote = schema_editor.quote_name
+    schema_editor.execute('ALTER TABLE %s ADD FULLTEXT INDEX %s (%s)' % (
+        quote(MenuItem._meta.db_table), quote('menuitem_title_fulltext'), quote('title')))
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    MenuItem = apps.get_model('LittleLemonAPI', 'MenuItem')
+    quote = schema_editor.quote_name
+    schema_editor.execute('ALTER TABLE %s DROP INDEX %s' % (
+        quote(MenuItem._meta.db_table), quote('menuitem_title_fulltext')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
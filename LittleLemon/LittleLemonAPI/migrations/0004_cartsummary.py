@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_summaries(apps, schema_editor):
+    Cart = apps.get_model('LittleLemonAPI', 'Cart')
+    CartSummary = apps.get_model('LittleLemonAPI', 'CartSummary')
+    CartSummary.objects.bulk_create([
+        CartSummary(user_id=row['user'], item_count=row['item_count'], subtotal=row['subtotal'])
+        for row in Cart.objects.values('user').annotate(item_count=Sum('quantity'), subtotal=Sum('price'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0003_updated_at'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('item_count', models.IntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+            ],
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
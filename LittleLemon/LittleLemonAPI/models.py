@@ -10,6 +10,13 @@ class MenuItem(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2, db_index=True)
     featured = models.BooleanField(db_index=True)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The menu list: ordered by category, narrowed by featured and price.
+            models.Index(fields=['category', 'featured', 'price'], name='menuitem_browse_idx'),
+        ]
 
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -20,6 +27,15 @@ class Cart(models.Model):
 
     class Meta:
         unique_together = ('menuitem', 'user')
+        indexes = [
+            # A customer's cart filtered by price.
+            models.Index(fields=['user', 'price'], name='cart_user_price_idx'),
+        ]
+
+class CartSummary(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    item_count = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=8, decimal_places=2, default=0)
 
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -27,6 +43,21 @@ class Order(models.Model):
     status = models.BooleanField(db_index=True, default=0)
     total = models.DecimalField(max_digits=6, decimal_places=2)
     date = models.DateField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # A crew member's queue: their open orders, oldest first.
+            models.Index(fields=['delivery_crew', 'status', 'date'], name='order_crew_queue_idx'),
+            # A customer's orders by date, and the manager's list by status.
+            models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+            models.Index(fields=['status', 'date'], name='order_status_date_idx'),
+        ]
+
+class OffShift(models.Model):
+    """A delivery crew member who is off shift and gets no new orders."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    since = models.DateTimeField(auto_now_add=True)
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
@@ -37,3 +68,26 @@ class OrderItem(models.Model):
 
     class Meta:
         unique_together = ('order', 'menuitem')
+
+
+class DailySales(models.Model):
+    date = models.DateField(unique=True)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+
+class DailyMenuItemSales(models.Model):
+    date = models.DateField()
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'menuitem')
+
+class DailyCrewDeliveries(models.Model):
+    date = models.DateField()
+    delivery_crew = models.ForeignKey(User, on_delete=models.CASCADE)
+    delivered = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'delivery_crew')
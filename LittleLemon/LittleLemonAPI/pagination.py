@@ -0,0 +1,79 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework import serializers
+
+# Cursors hold column values; anything else in one was not written by us.
+MAX_INT = 2 ** 63 - 1
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise serializers.ValidationError({'cursor': 'Cursor invalid'})
+    if not isinstance(values, list) or len(values) != size or not all(map(is_cursor_value, values)):
+        raise serializers.ValidationError({'cursor': 'Cursor invalid'})
+    return values
+
+def is_cursor_value(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -MAX_INT <= value <= MAX_INT
+    return isinstance(value, (str, float))
+
+
+class KeysetPaginator:
+    """Cursor pagination over a fixed, unique ordering of ``keys``.
+
+    Unlike ``django.core.paginator.Paginator`` this never runs a COUNT and
+    resumes from the last row seen with a range condition on the ordering
+    columns, so deep pages cost the same as the first one. The last key
+    must be unique (the primary key) for the cursor to be stable.
+    """
+
+    def __init__(self, queryset, keys, per_page):
+        self.queryset = queryset.order_by(*keys)
+        self.keys = keys
+        try:
+            self.per_page = int(per_page)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError({'perpage': 'Perpage invalid'})
+        if self.per_page < 1:
+            raise serializers.ValidationError({'perpage': 'Perpage invalid'})
+
+    def seek(self, values):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), expanded for any
+        # number of keys so it works on backends without row comparisons.
+        condition = Q()
+        for index, key in enumerate(self.keys):
+            step = Q(**{key + '__gt': values[index]})
+            for previous, value in zip(self.keys[:index], values[:index]):
+                step &= Q(**{previous: value})
+            condition |= step
+        return self.queryset.filter(condition)
+
+    def page(self, cursor=None):
+        """Return ``(rows, next_cursor)``; ``next_cursor`` is None on the last page."""
+        queryset = self.queryset
+        if cursor:
+            try:
+                queryset = self.seek(decode_cursor(cursor, len(self.keys)))
+            except (ValueError, TypeError, DjangoValidationError):
+                # A value of the wrong type for its column, e.g. "x" for an id.
+                raise serializers.ValidationError({'cursor': 'Cursor invalid'})
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            last = rows[-1]
+            next_cursor = encode_cursor([getattr(last, key) for key in self.keys])
+        return rows, next_cursor
@@ -1,17 +1,18 @@
 from rest_framework import permissions
 
+from .roles import is_manager, is_delivery_crew, is_customer
+
 class IsManager(permissions.BasePermission):
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Manager').exists()
+        return is_manager(request)
     
 class IsDeliveryCrew(permissions.BasePermission):
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Delivery Crew').exists()
+        return is_delivery_crew(request)
     
 class IsCustomer(permissions.BasePermission):
 
     def has_permission(self, request, view):
-        return not(request.user.groups.filter(name='Manager').exists() or\
-                    request.user.groups.filter(name='Delivery Crew').exists()) 
\ No newline at end of file
+        return is_customer(request)
@@ -0,0 +1,39 @@
+from functools import lru_cache
+
+from rest_framework import serializers
+
+
+@lru_cache(maxsize=None)
+def plan_relations(serializer_class):
+    """Return ``(select_related, prefetch_related)`` paths for a serializer.
+
+    Every readable nested serializer is a relation the serializer will
+    touch while rendering, so the nesting itself is the declaration:
+    nested single objects become ``select_related`` joins and nested
+    ``many=True`` serializers (and anything below them) become
+    ``prefetch_related`` lookups.
+    """
+    select, prefetch = [], []
+    walk_fields(serializer_class(), '', False, select, prefetch)
+    return tuple(select), tuple(prefetch)
+
+def walk_fields(serializer, prefix, in_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        path = prefix + field.source.replace('.', '__')
+        if isinstance(field, serializers.ListSerializer):
+            prefetch.append(path)
+            walk_fields(field.child, path + '__', True, select, prefetch)
+        elif isinstance(field, serializers.BaseSerializer):
+            (prefetch if in_prefetch else select).append(path)
+            walk_fields(field, path + '__', in_prefetch, select, prefetch)
+
+def optimize_queryset(queryset, serializer_class):
+    """Apply the joins/prefetches ``serializer_class`` needs to ``queryset``."""
+    select, prefetch = plan_relations(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
@@ -0,0 +1,242 @@
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('LittleLemonAPI.profiling')
+
+SECTIONS = ['sql', 'serializer', 'permissions', 'throttle']
+
+current = ContextVar('littlelemon_profile', default=None)
+
+
+class Profile:
+    """Timings collected for one sampled request."""
+
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.path
+        self.view = None
+        self.queries = 0
+        self.timings = dict.fromkeys(SECTIONS, 0.0)
+        self.serializing = False
+        self.started = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.timings[name] += seconds
+
+    def as_dict(self, status, duration):
+        return {
+            'method': self.method,
+            'path': self.path,
+            'view': self.view,
+            'status': status,
+            'queries': self.queries,
+            'total_ms': round(duration * 1000, 3),
+            **{name + '_ms': round(seconds * 1000, 3) for name, seconds in self.timings.items()},
+        }
+
+
+@contextmanager
+def section(name):
+    """Add the time spent in the block to ``name`` of the current profile, if any."""
+    profile = current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    profile = current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.add('sql', time.perf_counter() - started)
+
+def add_query_hook(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+def install_query_hook():
+    """Count queries on every connection, including ones opened later."""
+    for connection in connections.all(initialized_only=True):
+        add_query_hook(connection)
+    connection_created.connect(add_query_hook, dispatch_uid='littlelemon_profiling')
+
+
+class ProfiledViewMixin:
+    """Times DRF's permission and throttle checks for the profiling middleware."""
+
+    def check_permissions(self, request):
+        with section('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with section('permissions'):
+            super().check_object_permissions(request, obj)
+
+    def check_throttles(self, request):
+        with section('throttle'):
+            super().check_throttles(request)
+
+
+class ProfiledSerializerMixin:
+    """Times ``to_representation()``, once per top-level serializer.
+
+    Nested and per-row calls of a ``many=True`` serializer fall inside the
+    outermost call, which is the only one timed.
+    """
+
+    def to_representation(self, instance):
+        profile = current.get()
+        if profile is None or profile.serializing:
+            return super().to_representation(instance)
+        profile.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            profile.serializing = False
+            profile.add('serializer', time.perf_counter() - started)
+
+
+class SlowestRequests:
+    """Bounded, thread-safe record of the ``size`` slowest requests seen."""
+
+    def __init__(self, size):
+        self.size = size
+        self.heap = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def add(self, record):
+        # The counter breaks ties so records themselves are never compared.
+        entry = (record['total_ms'], next(self.counter), record)
+        with self.lock:
+            if len(self.heap) < self.size:
+                heapq.heappush(self.heap, entry)
+            elif entry[0] > self.heap[0][0]:
+                heapq.heapreplace(self.heap, entry)
+
+    def snapshot(self):
+        with self.lock:
+            entries = list(self.heap)
+        return [record for total, count, record in sorted(entries, key=lambda entry: -entry[0])]
+
+    def clear(self):
+        with self.lock:
+            self.heap = []
+
+
+_slowest = None
+
+def get_slowest():
+    global _slowest
+    if _slowest is None:
+        _slowest = SlowestRequests(getattr(settings, 'PROFILING_SLOWEST', 50))
+    return _slowest
+
+def reset_slowest(**kwargs):
+    global _slowest
+    _slowest = None
+
+setting_changed.connect(reset_slowest)
+
+
+def view_name(view_func):
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return '%s.%s' % (view_func.__module__, view_func.__qualname__)
+    return cls.__name__
+
+
+def server_timing(record):
+    metrics = ['%s;dur=%.3f' % (name, record[name + '_ms']) for name in SECTIONS]
+    metrics[0] += ';desc="%d queries"' % record['queries']
+    metrics.append('total;dur=%.3f' % record['total_ms'])
+    return ', '.join(metrics)
+
+
+class ProfilingMiddleware:
+    """Per-request SQL, serializer, permission and throttle timings.
+
+    Enabled with ``PROFILING_ENABLED``; otherwise Django drops it from the
+    stack at startup. A ``PROFILING_SAMPLE_RATE`` share of requests is
+    profiled: each gets a ``Server-Timing`` header and a JSON log line on
+    ``LittleLemonAPI.profiling``, and the slowest ``PROFILING_SLOWEST`` are
+    kept for the ``profiling/slowest`` endpoint.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+        install_query_hook()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        profile = Profile(request)
+        token = current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(profile, response)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        profile = Profile(request)
+        token = current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(profile, response)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = current.get()
+        if profile is not None:
+            profile.view = view_name(view_func)
+            actions = getattr(view_func, 'actions', None)
+            if actions and request.method.lower() in actions:
+                profile.view += '.' + actions[request.method.lower()]
+
+    def finish(self, profile, response):
+        record = profile.as_dict(response.status_code, time.perf_counter() - profile.started)
+        response['Server-Timing'] = server_timing(record)
+        logger.info(json.dumps(record))
+        get_slowest().add(record)
+        return response
@@ -0,0 +1,125 @@
+import json
+import re
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import QueryDict
+
+from .models import Category, Cart, Order
+from .roles import MANAGER, DELIVERY_CREW
+
+PAGE_SIZE = 20
+
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?: AS \w+)?$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on "?(\w+)')
+
+
+def full_scans(plan, vendor=None):
+    """The tables ``plan`` (a ``QuerySet.explain()`` result) reads in full.
+
+    Index scans, even of a whole index, do not count: they read in index
+    order and stop at the LIMIT.
+    """
+    vendor = vendor or connection.vendor
+    if vendor == 'sqlite':
+        # Plan lines look like "6 0 0 SCAN LittleLemonAPI_order USING INDEX ...".
+        return [match.group(1) for line in plan.splitlines()
+                for match in [SQLITE_SCAN.search(line.strip())] if match]
+    if vendor == 'postgresql':
+        return POSTGRES_SCAN.findall(plan)
+    if vendor == 'mysql':
+        return [table['table_name'] for table in mysql_tables(json.loads(plan))
+                if table.get('access_type') == 'ALL']
+    raise ValueError('No plan reader for %s' % vendor)
+
+def mysql_tables(node):
+    if isinstance(node, dict):
+        if 'table_name' in node:
+            yield node
+        for value in node.values():
+            yield from mysql_tables(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from mysql_tables(value)
+
+def explain(queryset):
+    if connection.vendor == 'mysql':
+        return queryset.explain(format='json')
+    return queryset.explain()
+
+
+def params(**values):
+    query = QueryDict(mutable=True)
+    query.update({key: str(value) for key, value in values.items()})
+    return query
+
+def audited_queries():
+    """``(name, queryset)`` for the page query of each list endpoint and filter.
+
+    The querysets come from the views themselves, so a filter added there
+    is audited as it is actually built. Values are taken from the data;
+    queries the data has no values for (no assigned order, no category)
+    are left out.
+    """
+    from .views import MenuItemView, CustomerCartView, OrdersView
+
+    customerId, date = Order.objects.order_by('-date').values_list('user', 'date').first()
+    crewId = Order.objects.filter(delivery_crew__isnull=False).values_list('delivery_crew', flat=True).first()
+    customer = User.objects.get(pk=customerId)
+    cartUser = User.objects.get(pk=Cart.objects.values_list('user', flat=True).first() or customerId)
+    category = Category.objects.values_list('title', flat=True).first()
+
+    menuItems = MenuItemView().get_menu_items
+    orders = OrdersView().get_orders
+    cart = CustomerCartView().get_cart
+    queries = [('menu_items.list', menuItems(params()))]
+    if category is not None:
+        queries.append(('menu_items.list.category', menuItems(params(category=category))))
+    queries += [
+        ('menu_items.list.featured', menuItems(params(featured=1))),
+        ('menu_items.list.to_price', menuItems(params(to_price=5))),
+    ]
+    if category is not None:
+        queries.append(('menu_items.list.category.featured', menuItems(params(category=category, featured=1, to_price=20))))
+    queries += [
+        ('cart.list', cart(params(), cartUser)),
+        ('cart.list.price', cart(params(price=10), cartUser)),
+        ('orders.list.customer', orders(params(), customer, set())),
+        ('orders.list.customer.date', orders(params(date=date), customer, set())),
+    ]
+    if crewId is not None:
+        crew = User.objects.get(pk=crewId)
+        queries += [
+            ('orders.list.crew', orders(params(), crew, {DELIVERY_CREW})),
+            ('orders.list.crew.status', orders(params(status=0), crew, {DELIVERY_CREW})),
+        ]
+    queries += [
+        ('orders.list.manager', orders(params(), customer, {MANAGER})),
+        ('orders.list.manager.status', orders(params(status=0), customer, {MANAGER})),
+    ]
+    if crewId is not None:
+        queries.append(('orders.list.manager.crew', orders(params(delivery_crew=crewId, status=0), customer, {MANAGER})))
+    return [(name, queryset[:PAGE_SIZE]) for name, queryset in queries]
+
+def analyze():
+    """Refresh the planner statistics for the tables the audited queries read."""
+    models = list(apps.get_app_config('LittleLemonAPI').get_models()) + [User, User.groups.through]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            # MySQL has no database-wide ANALYZE; it reports one row per table.
+            cursor.execute('ANALYZE TABLE %s' % ', '.join(
+                connection.ops.quote_name(model._meta.db_table) for model in models))
+            cursor.fetchall()
+        else:
+            cursor.execute('ANALYZE')
+
+def audit(only=None):
+    """Explain every audited query; returns ``[(name, plan, full scans)]``."""
+    results = []
+    for name, queryset in audited_queries():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        plan = explain(queryset)
+        results.append((name, plan, full_scans(plan)))
+    return results
@@ -0,0 +1,86 @@
+from rest_framework import serializers
+
+from .profiling import section
+
+
+price = serializers.DecimalField(max_digits=6, decimal_places=2).to_representation
+date = serializers.DateField().to_representation
+
+
+class RowReader:
+    """Read-only stand-in for a ModelSerializer on list endpoints.
+
+    ``shape`` mirrors the serializer's fields as ``(key, column, convert)``
+    entries, where ``column`` is a ``values_list`` lookup or a nested
+    RowReader. ``read()`` fetches plain tuples (one query, no model
+    instances) and ``compile()`` turns the shape into a single function
+    that builds the same dicts the serializer would, so the rendered JSON
+    is identical.
+    """
+
+    def __init__(self, shape, nullable_by=None):
+        self.shape = shape
+        self.nullable_by = nullable_by
+        self.columns = []
+        self.build = self.compile(self.columns, prefix='')
+
+    def compile(self, columns, prefix):
+        steps = []
+        for key, column, convert in self.shape:
+            if isinstance(column, RowReader):
+                steps.append((key, column.compile(columns, prefix + key + '__')))
+            else:
+                index = len(columns)
+                columns.append(prefix + column)
+                if convert is None:
+                    steps.append((key, lambda row, index=index: row[index]))
+                else:
+                    steps.append((key, lambda row, index=index, convert=convert: convert(row[index])))
+
+        if self.nullable_by is None:
+            return lambda row: {key: step(row) for key, step in steps}
+        # A nullable relation (LEFT JOIN) renders as None, like the serializer.
+        guard = columns.index(prefix + self.nullable_by)
+        return lambda row: None if row[guard] is None else {key: step(row) for key, step in steps}
+
+    def values(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def read(self, rows):
+        build = self.build
+        with section('serializer'):
+            return [build(row) for row in rows]
+
+
+user_reader = RowReader([
+    ('id', 'id', None),
+    ('username', 'username', None),
+])
+
+category_reader = RowReader([
+    ('slug', 'slug', None),
+    ('title', 'title', None),
+])
+
+menu_item_reader = RowReader([
+    ('title', 'title', None),
+    ('price', 'price', price),
+    ('featured', 'featured', None),
+    ('category', category_reader, None),
+])
+
+cart_reader = RowReader([
+    ('user', user_reader, None),
+    ('menuitem', menu_item_reader, None),
+    ('quantity', 'quantity', None),
+    ('unit_price', 'unit_price', price),
+    ('price', 'price', price),
+])
+
+order_reader = RowReader([
+    ('user', user_reader, None),
+    ('delivery_crew', RowReader(user_reader.shape, nullable_by='id'), None),
+    ('status', 'status', None),
+    ('total', 'total', price),
+    ('date', 'date', date),
+])
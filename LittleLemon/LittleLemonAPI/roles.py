@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.http import Http404
+from django.utils.text import slugify
+
+from .tokens import token_cache
+
+MANAGER = 'Manager'
+DELIVERY_CREW = 'Delivery Crew'
+
+
+def role_cache_key(user_id):
+    return 'littlelemon:roles:%s' % user_id
+
+def get_roles(request):
+    """Return the group names of ``request.user`` as a frozenset.
+
+    The names are loaded with a single query, memoized on the underlying
+    HttpRequest so every permission class and view shares them, and kept in
+    the Django cache between requests for ``ROLE_CACHE_TIMEOUT`` seconds
+    (0 turns that off; the cache must be shared by all workers).
+    """
+    http_request = getattr(request, '_request', request)
+    roles = getattr(http_request, '_littlelemon_roles', None)
+    if roles is not None:
+        return roles
+
+    user = request.user
+    if not user or not user.is_authenticated:
+        roles = frozenset()
+    else:
+        timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+        roles = cache.get(role_cache_key(user.pk)) if timeout else None
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            if timeout:
+                cache.set(role_cache_key(user.pk), roles, timeout)
+
+    http_request._littlelemon_roles = roles
+    return roles
+
+def remember_roles(request, roles):
+    """Seed the per-request memo, e.g. from roles the authentication already knows."""
+    getattr(request, '_request', request)._littlelemon_roles = roles
+
+async def aget_roles(request, user):
+    """``get_roles()`` for async views, which resolve ``user`` themselves."""
+    roles = getattr(request, '_littlelemon_roles', None)
+    if roles is not None:
+        return roles
+    if not user or not user.is_authenticated:
+        roles = frozenset()
+    else:
+        timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+        roles = await cache.aget(role_cache_key(user.pk)) if timeout else None
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+            if timeout:
+                await cache.aset(role_cache_key(user.pk), roles, timeout)
+
+    request._littlelemon_roles = roles
+    return roles
+
+def invalidate_roles(*user_ids):
+    # Any membership change can also change who is in a role.
+    cache.delete_many([role_cache_key(user_id) for user_id in user_ids]
+                      + [role_members_cache_key(name) for name in (MANAGER, DELIVERY_CREW)])
+    token_cache.forget_users(*user_ids)
+
+def is_manager(request):
+    return MANAGER in get_roles(request)
+
+def is_delivery_crew(request):
+    return DELIVERY_CREW in get_roles(request)
+
+def is_customer(request):
+    roles = get_roles(request)
+    return not (MANAGER in roles or DELIVERY_CREW in roles)
+
+
+_group_ids = {}
+
+def get_group_id(name):
+    """The pk of the named group, looked up once per process."""
+    group_id = _group_ids.get(name)
+    if group_id is None:
+        group_id = Group.objects.filter(name=name).values_list('pk', flat=True).first()
+        if group_id is None:
+            raise Http404('No Group matches the given query.')
+        _group_ids[name] = group_id
+    return group_id
+
+def role_members_cache_key(name):
+    # Group names have spaces, which memcached does not allow in keys.
+    return 'littlelemon:role-members:%s' % slugify(name)
+
+def get_role_member_ids(name):
+    """Ids of the active users in the named group, cached like the roles."""
+    timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+    userIds = cache.get(role_members_cache_key(name)) if timeout else None
+    if userIds is None:
+        userIds = list(User.objects.filter(groups__name=name, is_active=True).order_by('pk').values_list('pk', flat=True))
+        if timeout:
+            cache.set(role_members_cache_key(name), userIds, timeout)
+    return userIds
+
+def forget_group_ids():
+    _group_ids.clear()
+
+def missing_users(user_ids):
+    """The ids in ``user_ids`` with no User, checked with one IN query."""
+    found = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    return sorted(set(user_ids) - found)
+
+def add_role_members(name, user_ids):
+    """Put users in a group with one through-table insert.
+
+    Bulk writes bypass m2m_changed, so the role cache is cleared here.
+    """
+    through = User.groups.through
+    group_id = get_group_id(name)
+    through.objects.bulk_create([through(user_id=user_id, group_id=group_id) for user_id in set(user_ids)],
+                                ignore_conflicts=True)
+    invalidate_roles(*user_ids)
+
+def remove_role_members(name, user_ids):
+    through = User.groups.through
+    deleted, _ = through.objects.filter(group_id=get_group_id(name), user_id__in=user_ids).delete()
+    invalidate_roles(*user_ids)
+    return deleted
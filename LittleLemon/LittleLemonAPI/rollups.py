@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F, Sum, Count, Case, When, Value, IntegerField, DecimalField
+
+from .models import Order, OrderItem, DailySales, DailyMenuItemSales, DailyCrewDeliveries
+
+
+def bump(model, keys, **deltas):
+    """Add ``deltas`` to the rollup row identified by ``keys``, creating it."""
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if not model.objects.filter(**keys).update(**changes):
+        model.objects.get_or_create(**keys)
+        model.objects.filter(**keys).update(**changes)
+
+def bump_menu_items(date, units, revenue):
+    """Add per-item deltas for one day in a constant number of queries."""
+    menuitem_ids = sorted(units)
+    DailyMenuItemSales.objects.bulk_create(
+        [DailyMenuItemSales(date=date, menuitem_id=menuitem_id) for menuitem_id in menuitem_ids],
+        ignore_conflicts=True,
+    )
+    DailyMenuItemSales.objects.filter(date=date, menuitem_id__in=menuitem_ids).update(
+        units=F('units') + Case(*[When(menuitem_id=pk, then=Value(units[pk])) for pk in menuitem_ids],
+                                output_field=IntegerField()),
+        revenue=F('revenue') + Case(*[When(menuitem_id=pk, then=Value(revenue[pk])) for pk in menuitem_ids],
+                                    output_field=DecimalField(max_digits=12, decimal_places=2)),
+    )
+
+def record_order(order, orderItems, sign=1):
+    """Count a new order (or, with ``sign=-1``, take a deleted one back out)."""
+    bump(DailySales, {'date': order.date}, revenue=sign * order.total, order_count=sign)
+    units, revenue = {}, {}
+    for item in orderItems:
+        units[item.menuitem_id] = units.get(item.menuitem_id, 0) + sign * item.quantity
+        revenue[item.menuitem_id] = revenue.get(item.menuitem_id, 0) + sign * item.price
+    if units:
+        bump_menu_items(order.date, units, revenue)
+    delivered_by = delivery_credit(order)
+    if delivered_by:
+        bump(DailyCrewDeliveries, {'date': order.date, 'delivery_crew_id': delivered_by}, delivered=sign)
+
+def delivery_credit(order):
+    """The crew member an order counts as delivered for, if any."""
+    return order.delivery_crew_id if order.status else None
+
+@contextmanager
+def tracking_delivery(order):
+    """Run an order update atomically and move its delivery credit if needed.
+
+        with tracking_delivery(order):
+            serialized_order.save()
+    """
+    before = delivery_credit(order)
+    with transaction.atomic():
+        yield
+        after = delivery_credit(order)
+        if before != after:
+            if before:
+                bump(DailyCrewDeliveries, {'date': order.date, 'delivery_crew_id': before}, delivered=-1)
+            if after:
+                bump(DailyCrewDeliveries, {'date': order.date, 'delivery_crew_id': after}, delivered=1)
+
+@transaction.atomic
+def delete_order(order):
+    record_order(order, order.orderitem_set.all(), sign=-1)
+    order.delete()
+
+@transaction.atomic
+def rebuild(start, end):
+    """Recompute every rollup row for ``start <= date <= end`` from the orders."""
+    orders = Order.objects.filter(date__gte=start, date__lte=end)
+    for model in (DailySales, DailyMenuItemSales, DailyCrewDeliveries):
+        model.objects.filter(date__gte=start, date__lte=end).delete()
+
+    DailySales.objects.bulk_create([
+        DailySales(date=row['date'], revenue=row['revenue'], order_count=row['order_count'])
+        for row in orders.values('date').annotate(revenue=Sum('total'), order_count=Count('id'))
+    ])
+    DailyMenuItemSales.objects.bulk_create([
+        DailyMenuItemSales(date=row['order__date'], menuitem_id=row['menuitem'],
+                           units=row['units'], revenue=row['revenue'])
+        for row in OrderItem.objects.filter(order__date__gte=start, order__date__lte=end)
+            .values('order__date', 'menuitem').annotate(units=Sum('quantity'), revenue=Sum('price'))
+    ])
+    DailyCrewDeliveries.objects.bulk_create([
+        DailyCrewDeliveries(date=row['date'], delivery_crew_id=row['delivery_crew'], delivered=row['delivered'])
+        for row in orders.filter(status=True, delivery_crew__isnull=False)
+            .values('date', 'delivery_crew').annotate(delivered=Count('id'))
+    ])
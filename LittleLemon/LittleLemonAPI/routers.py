@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+REPLICA = 'replica'
+
+reading_from_replica = ContextVar('littlelemon_replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Route this app's reads inside the block to the replica, if there is one."""
+    token = reading_from_replica.set(True)
+    try:
+        yield
+    finally:
+        reading_from_replica.reset(token)
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, even under ``replica_reads()``."""
+    token = reading_from_replica.set(False)
+    try:
+        yield
+    finally:
+        reading_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads made under ``replica_reads()`` to the ``replica`` alias.
+
+    Only LittleLemonAPI models are routed, so authentication, tokens and
+    groups are always read from the primary and see their own writes.
+    Everything else, including all writes and checkout, uses ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (reading_from_replica.get() and model._meta.app_label == 'LittleLemonAPI'
+                and REPLICA in connections.settings):
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaReadMixin:
+    """Serve a ViewSet's GET and HEAD requests from the replica.
+
+    Shared cache fills still read from the primary (see ``cache.py``).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            with replica_reads():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,311 @@
+import bisect
+import re
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Category, MenuItem
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """In-memory token -> ids index with prefix lookups.
+
+    Tokens are also kept in a sorted list so a prefix query is a bisect
+    plus a scan over the matching tokens only, independent of the number
+    of items indexed. Each document can carry a tuple of ``fields`` that
+    searches filter on.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []
+        self.documents = {}
+        self.fields = {}
+        self.lock = threading.Lock()
+
+    def add(self, doc_id, text, fields=()):
+        with self.lock:
+            self._remove(doc_id)
+            tokens = set(tokenize(text))
+            self.documents[doc_id] = tokens
+            self.fields[doc_id] = fields
+            for token in tokens:
+                if token not in self.postings:
+                    self.postings[token] = set()
+                    bisect.insort(self.tokens, token)
+                self.postings[token].add(doc_id)
+
+    def load(self, documents):
+        """Fill an empty index from ``(doc_id, text, fields)`` rows, sorting once."""
+        with self.lock:
+            for doc_id, text, fields in documents:
+                tokens = set(tokenize(text))
+                self.documents[doc_id] = tokens
+                self.fields[doc_id] = fields
+                for token in tokens:
+                    self.postings.setdefault(token, set()).add(doc_id)
+            self.tokens = sorted(self.postings)
+
+    def remove(self, doc_id):
+        with self.lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        self.fields.pop(doc_id, None)
+        for token in self.documents.pop(doc_id, ()):
+            postings = self.postings[token]
+            postings.discard(doc_id)
+            if not postings:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def prefix_postings(self, prefix):
+        tokens = self.tokens
+        for position in range(bisect.bisect_left(tokens, prefix), len(tokens)):
+            token = tokens[position]
+            if not token.startswith(prefix):
+                break
+            yield token, self.postings[token]
+
+    def search(self, query, match=None):
+        """Return ``[(doc_id, score), ...]`` best first.
+
+        Every query term has to match a token exactly or as a prefix; exact
+        matches score 2 and prefix matches 1, summed over the terms. With
+        ``match``, only documents whose fields pass ``match(fields)`` count.
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        with self.lock:
+            # Only the longest (usually most selective) term is expanded
+            # through the postings; its candidates are then checked against
+            # their own tokens, so the cost follows the size of that match
+            # rather than the size of the menu.
+            seed = max(terms, key=len)
+            candidates = set()
+            for token, postings in self.prefix_postings(seed):
+                candidates.update(postings)
+
+            results = []
+            for doc_id in candidates:
+                if match is not None and not match(self.fields[doc_id]):
+                    continue
+                score = self.score(self.documents[doc_id], terms)
+                if score:
+                    results.append((doc_id, score))
+        return sorted(results, key=lambda item: (-item[1], item[0]))
+
+    @staticmethod
+    def score(tokens, terms):
+        total = 0
+        for term in terms:
+            best = 0
+            for token in tokens:
+                if token == term:
+                    best = 2
+                    break
+                if token.startswith(term):
+                    best = 1
+            if not best:
+                return 0
+            total += best
+        return total
+
+
+class InMemorySearchBackend:
+    """Search backend for SQLite dev/test runs.
+
+    The index is built from the database on first use and then kept up to
+    date from MenuItem save/delete signals. Writes that bypass signals
+    (``bulk_create``, ``QuerySet.update``) must call ``reset()``. Each
+    process holds its own index, so this is not meant for multi-worker
+    deployments.
+
+    Items are indexed with their category, price and featured flag, so the
+    list filters are applied in the index and pages and counts are read
+    from its ranking without asking the database for every match.
+    """
+    indexed_fields = ('category_id', 'price', 'featured')
+
+    def __init__(self):
+        self.index = None
+        self.lock = threading.Lock()
+
+    def get_index(self):
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    index = InvertedIndex()
+                    index.load((pk, title, tuple(fields)) for pk, title, *fields in
+                               MenuItem.objects.values_list('pk', 'title', *self.indexed_fields).iterator())
+                    self.index = index
+        return self.index
+
+    def reset(self):
+        self.index = None
+
+    def item_saved(self, menuItem):
+        if self.index is not None:
+            # Normalised as the database returns them: the instance may hold a string price.
+            fields = tuple(MenuItem._meta.get_field(name).to_python(getattr(menuItem, name))
+                           for name in self.indexed_fields)
+            self.index.add(menuItem.pk, menuItem.title, fields)
+
+    def item_deleted(self, menuItem):
+        if self.index is not None:
+            self.index.remove(menuItem.pk)
+
+    def matcher(self, category=None, to_price=None, featured=None):
+        """A ``match`` for ``InvertedIndex.search`` doing the list view's filters, or None."""
+        conditions = []
+        if category:
+            categoryIds = set(Category.objects.filter(title=category).values_list('pk', flat=True))
+            conditions.append(lambda fields: fields[0] in categoryIds)
+        if to_price:
+            to_price = MenuItem._meta.get_field('price').to_python(to_price)
+            conditions.append(lambda fields: fields[1] <= to_price)
+        if featured:
+            featured = MenuItem._meta.get_field('featured').to_python(featured)
+            conditions.append(lambda fields: fields[2] == featured)
+        if not conditions:
+            return None
+        return lambda fields: all(condition(fields) for condition in conditions)
+
+    def filter(self, queryset, query, **filters):
+        """Ranked matches of ``query`` in ``queryset``.
+
+        ``filters`` (``category``, ``to_price``, ``featured``) must be the
+        list filters already applied to ``queryset``: the ranking and the
+        counts come from the index alone.
+        """
+        results = self.get_index().search(query, self.matcher(**filters))
+        if not results:
+            return queryset.none()
+        return SearchResults(queryset, results)
+
+
+class SearchResults:
+    """Ranked hits over ``queryset``, read from the database a page at a time.
+
+    The index has already ranked and filtered the matches, so counting is
+    the length of its ranking and slicing picks the page's ids from it;
+    only those rows are fetched and the SQL stays the same size however
+    many items match. Supports what the list views and paginators use:
+    ``count()``, slicing, ``values_list()`` and ``order_by()`` (keyset
+    pages, which order by their own keys).
+    """
+    ordered = True
+
+    def __init__(self, queryset, ranked, fields=None):
+        self.queryset = queryset
+        self.ranked = ranked
+        self.fields = fields
+
+    def count(self):
+        return len(self.ranked)
+
+    def __len__(self):
+        return self.count()
+
+    def values_list(self, *fields):
+        return SearchResults(self.queryset, self.ranked, fields)
+
+    def order_by(self, *keys):
+        return self.queryset.filter(pk__in=[pk for pk, score in self.ranked]).order_by(*keys)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return SearchPage(self, [pk for pk, score in self.ranked[key]])
+        return list(SearchPage(self, [self.ranked[key][0]]))[0]
+
+    def __iter__(self):
+        return iter(SearchPage(self, [pk for pk, score in self.ranked]))
+
+    def page_query(self, ids):
+        queryset = self.queryset.filter(pk__in=ids)
+        if self.fields is not None:
+            return queryset.values_list('pk', *self.fields)
+        return queryset
+
+    def in_rank_order(self, ids, rows):
+        if self.fields is not None:
+            rows = {row[0]: row[1:] for row in rows}
+        else:
+            rows = {row.pk: row for row in rows}
+        return [rows[pk] for pk in ids if pk in rows]
+
+
+class SearchPage:
+    """One slice of SearchResults; iterating it runs a single ``pk IN`` query."""
+
+    def __init__(self, results, ids):
+        self.results = results
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        if not self.ids:
+            return iter([])
+        rows = list(self.results.page_query(self.ids))
+        return iter(self.results.in_rank_order(self.ids, rows))
+
+    async def __aiter__(self):
+        if self.ids:
+            rows = [row async for row in self.results.page_query(self.ids)]
+            for row in self.results.in_rank_order(self.ids, rows):
+                yield row
+
+
+class MySQLFullTextSearchBackend:
+    """Search backend using the FULLTEXT index on MenuItem.title."""
+
+    def reset(self):
+        pass
+
+    def item_saved(self, menuItem):
+        pass
+
+    def item_deleted(self, menuItem):
+        pass
+
+    def filter(self, queryset, query, **filters):
+        # ``filters`` are already on the queryset, which MySQL filters itself.
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        # Boolean mode: every term required, each one also matching as a prefix.
+        against = ' '.join('+%s*' % term for term in terms)
+        column = '%s.%s' % (
+            connection.ops.quote_name(MenuItem._meta.db_table),
+            connection.ops.quote_name('title'),
+        )
+        rank = RawSQL('MATCH (%s) AGAINST (%%s IN BOOLEAN MODE)' % column, (against,))
+        return queryset.annotate(search_rank=rank).filter(search_rank__gt=0) \
+            .order_by('-search_rank', 'pk')
+
+
+search_backend = None
+
+def get_search_backend():
+    global search_backend
+    if search_backend is None:
+        path = getattr(settings, 'MENU_SEARCH_BACKEND', None)
+        if path:
+            search_backend = import_string(path)()
+        elif connection.vendor == 'mysql':
+            search_backend = MySQLFullTextSearchBackend()
+        else:
+            search_backend = InMemorySearchBackend()
+    return search_backend
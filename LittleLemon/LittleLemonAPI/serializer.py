@@ -1,14 +1,15 @@
 from rest_framework import serializers
-from .models import Category, MenuItem, Cart, Order, OrderItem
+from .profiling import ProfiledSerializerMixin
+from .models import Category, MenuItem, Cart, CartSummary, Order, OrderItem, DailySales
 from django.contrib.auth.models import User, Group
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Category
         fields = ['slug','title']
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
 
     category = CategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
@@ -22,19 +23,25 @@ class MenuItemSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Category_Id invalid")
         return value
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model=Group
         fields = ['id','name']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
 
     username=serializers.CharField(read_only=True)
     class Meta:
         model = User
         fields=['id','username']
 
-class CartSerializer(serializers.ModelSerializer):
+class RoleMembersSerializer(serializers.Serializer):
+    users = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+
+class ShiftEndSerializer(serializers.Serializer):
+    to = serializers.IntegerField(required=False, allow_null=True)
+
+class CartSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
 
     user = UserSerializer(read_only=True)
 
@@ -52,7 +59,20 @@ class CartSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Menuitem_Id invalid")
         return value
 
-class OrderSerializer(serializers.ModelSerializer):
+class CartDeltaSerializer(serializers.Serializer):
+    menuitem_id = serializers.IntegerField()
+    quantity_delta = serializers.IntegerField(min_value=-32767, max_value=32767)
+
+class CartLineSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=0, max_value=32767)
+
+class CartSummarySerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = CartSummary
+        fields = ['item_count', 'subtotal']
+
+class OrderSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     delivery_crew = UserSerializer(required=False)
     status = serializers.BooleanField()
@@ -63,7 +83,7 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['user', 'delivery_crew', 'status', 'total', 'date']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     order = OrderSerializer(read_only=True)
     menuitem=MenuItemSerializer(read_only=True)
     quantity = serializers.IntegerField(read_only=True)
@@ -72,4 +92,21 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderItem
-        fields = ['order', 'menuitem', 'quantity', 'unit_price','price']
\ No newline at end of file
+        fields = ['order', 'menuitem', 'quantity', 'unit_price','price']
+
+class DailySalesSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = DailySales
+        fields = ['date', 'revenue', 'order_count']
+
+class TopMenuItemSerializer(ProfiledSerializerMixin, serializers.Serializer):
+    menuitem_id = serializers.IntegerField(source='menuitem')
+    title = serializers.CharField(source='menuitem__title')
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+class CrewDeliveriesSerializer(ProfiledSerializerMixin, serializers.Serializer):
+    delivery_crew_id = serializers.IntegerField(source='delivery_crew')
+    username = serializers.CharField(source='delivery_crew__username')
+    delivered = serializers.IntegerField()
\ No newline at end of file
@@ -0,0 +1,98 @@
+from django.contrib.auth import user_logged_out
+from django.contrib.auth.models import User, Group
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .models import Category, MenuItem, Cart
+from .cache import bump_menu_generation
+from .roles import invalidate_roles, forget_group_ids
+from .search import get_search_backend
+from .snapshots import schedule_publish
+from .tokens import token_cache
+from .carts import reprice_menu_item, rebuild_summaries
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_menu_cache(sender, **kwargs):
+    # Bumped before the commit, a concurrent read could cache the old rows
+    # under the new generation and keep serving them.
+    transaction.on_commit(bump_menu_generation)
+    schedule_publish()
+
+
+@receiver(post_save, sender=Category)
+def touch_category_items(sender, instance, created, **kwargs):
+    # Menu item responses embed the category, so their validators must move too.
+    if not created:
+        MenuItem.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=MenuItem)
+def reprice_cart_lines(sender, instance, created, **kwargs):
+    if not created:
+        reprice_menu_item(instance)
+
+
+@receiver(pre_delete, sender=MenuItem)
+def remember_cart_users(sender, instance, **kwargs):
+    # The cart lines cascade away with the item; their owners' summaries
+    # are rebuilt once the delete has gone through.
+    instance._cart_user_ids = list(Cart.objects.filter(menuitem=instance).values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender=MenuItem)
+def rebuild_cart_summaries(sender, instance, **kwargs):
+    if getattr(instance, '_cart_user_ids', None):
+        rebuild_summaries(instance._cart_user_ids)
+
+
+@receiver(post_save, sender=MenuItem)
+def index_menu_item(sender, instance, **kwargs):
+    get_search_backend().item_saved(instance)
+
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, **kwargs):
+    get_search_backend().item_deleted(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        # user.groups.add(...) / remove / clear
+        invalidate_roles(instance.pk)
+    elif action == 'pre_clear':
+        invalidate_roles(*instance.user_set.values_list('pk', flat=True))
+    else:
+        # group.user_set.add(...) / remove, as done by the group views
+        invalidate_roles(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_cached_group_ids(sender, **kwargs):
+    forget_group_ids()
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    token_cache.forget(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(user_logged_out)
+def forget_user_tokens(sender, **kwargs):
+    # The cached entries carry username and is_active, and djoser's logout
+    # deletes the token before announcing it.
+    user = kwargs.get('instance') or kwargs.get('user')
+    if user is not None and user.pk is not None:
+        token_cache.forget_users(user.pk)
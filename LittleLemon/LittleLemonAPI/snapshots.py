@@ -0,0 +1,307 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from .models import Category, MenuItem
+from .cache import get_cache, get_menu_generation
+from .conditional import ConditionalGetMixin
+from .readers import menu_item_reader
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SNAPSHOT_PARAMS = {'category', 'featured', 'perpage', 'page'}
+# The values BooleanField accepts in the featured filter, by what they mean.
+FEATURED = {'t': 'true', 'True': 'true', '1': 'true', 'f': 'false', 'False': 'false', '0': 'false'}
+
+
+def page_key(category, featured, perpage, page):
+    return json.dumps([category, featured, perpage, page])
+
+
+class Blob:
+    """One rendered page, with its precompressed encodings and content hash."""
+
+    def __init__(self, name, encodings):
+        self.name = name
+        self.etag = quote_etag(name)
+        self.encodings = encodings
+
+    @classmethod
+    def compress(cls, content):
+        encodings = {'identity': content, 'gzip': gzip.compress(content, mtime=0)}
+        if brotli is not None:
+            encodings['br'] = brotli.compress(content, quality=getattr(settings, 'MENU_SNAPSHOT_BROTLI_QUALITY', 9))
+        return cls('m-' + hashlib.sha256(content).hexdigest()[:32], encodings)
+
+    def encoding_for(self, accept_encoding):
+        accepted = {coding.split(';')[0].strip() for coding in accept_encoding.split(',')}
+        for coding in ('br', 'gzip'):
+            if coding in accepted and coding in self.encodings:
+                return coding
+        return 'identity'
+
+
+class Snapshot:
+
+    def __init__(self, generation, blobs):
+        self.generation = generation
+        self.blobs = blobs
+        self.empty = Blob.compress(JSONRenderer().render([]))
+        self.hash = hashlib.sha256(''.join(sorted(blob.etag for blob in blobs.values())).encode()).hexdigest()
+
+    def blob_for(self, query_params):
+        """The page for an unfiltered browsing request, or None if it is not one.
+
+        Combinations that were not compiled (unknown categories, pages past
+        the end) would be empty lists live too, so they get the empty page.
+        """
+        if not set(query_params) <= SNAPSHOT_PARAMS:
+            return None
+        category = query_params.get('category') or None
+        featured = query_params.get('featured') or None
+        perpage = query_params.get('perpage', '2')
+        page = query_params.get('page', '1')
+        if featured is not None and featured not in FEATURED:
+            return None
+        if not (perpage.isdigit() and page.isdigit()) or int(perpage) not in menu_snapshot_perpage():
+            return None
+        key = page_key(category, FEATURED.get(featured), int(perpage), int(page))
+        return self.blobs.get(key, self.empty)
+
+
+def menu_snapshot_perpage():
+    return getattr(settings, 'MENU_SNAPSHOT_PERPAGE', [2])
+
+def compile_snapshot():
+    """Render every category/featured page of the menu list at the current generation."""
+    generation = get_menu_generation()
+    renderer = JSONRenderer()
+    blobs = {}
+    for category in [None] + list(Category.objects.values_list('title', flat=True)):
+        for featured in (None, 'true', 'false'):
+            menuItemList = MenuItem.objects.order_by('category')
+            if category:
+                menuItemList = menuItemList.filter(category__title=category)
+            if featured:
+                menuItemList = menuItemList.filter(featured=featured == 'true')
+            rows = menu_item_reader.read(menu_item_reader.values(menuItemList))
+            for perpage in menu_snapshot_perpage():
+                for start in range(0, len(rows), perpage):
+                    key = page_key(category, featured, perpage, start // perpage + 1)
+                    blobs[key] = Blob.compress(renderer.render(rows[start:start + perpage]))
+    return Snapshot(generation, blobs)
+
+
+def snapshot_timeout():
+    return getattr(settings, 'MENU_SNAPSHOT_TIMEOUT', getattr(settings, 'MENU_CACHE_TIMEOUT', 300))
+
+
+class CacheSnapshotStore:
+    """Keeps the snapshot as one entry in the menu cache.
+
+    The cache must be shared by every worker (see checks.py) and the entry
+    expires after MENU_SNAPSHOT_TIMEOUT; it is republished on the next read
+    that misses it.
+    """
+
+    def key(self, generation):
+        return 'littlelemon:menu:snapshot:%s' % generation
+
+    def save(self, snapshot):
+        cache = get_cache()
+        cache.set(self.key(snapshot.generation), snapshot, snapshot_timeout())
+        cache.delete(self.key(snapshot.generation - 1))
+
+    def published(self, generation):
+        return self.key(generation) in get_cache()
+
+    def load(self, generation):
+        return get_cache().get(self.key(generation))
+
+
+class FileSnapshotStore:
+    """Writes content-addressed blob files and a manifest under ``directory``.
+
+    Blobs are named by their hash, so pages that did not change are not
+    rewritten, and the manifest is swapped in atomically last.
+    """
+    suffixes = {'identity': '.json', 'gzip': '.json.gz', 'br': '.json.br'}
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def save(self, snapshot):
+        os.makedirs(self.directory, exist_ok=True)
+        pages = {}
+        for key, blob in snapshot.blobs.items():
+            for coding, content in blob.encodings.items():
+                if not os.path.exists(self.path(blob.name + self.suffixes[coding])):
+                    with open(self.path(blob.name + self.suffixes[coding]), 'wb') as output:
+                        output.write(content)
+            pages[key] = blob.name
+        manifest = {'generation': snapshot.generation, 'hash': snapshot.hash, 'pages': pages}
+        with open(self.path('manifest.json.tmp'), 'w') as output:
+            json.dump(manifest, output)
+        os.replace(self.path('manifest.json.tmp'), self.path('manifest.json'))
+
+    def manifest(self):
+        try:
+            with open(self.path('manifest.json')) as manifest:
+                return json.load(manifest)
+        except FileNotFoundError:
+            return None
+
+    def published(self, generation):
+        manifest = self.manifest()
+        return manifest is not None and manifest['generation'] == generation
+
+    def load(self, generation):
+        manifest = self.manifest()
+        if manifest is None or manifest['generation'] != generation:
+            return None
+        blobs = {}
+        for name in set(manifest['pages'].values()):
+            encodings = {}
+            for coding, suffix in self.suffixes.items():
+                if os.path.exists(self.path(name + suffix)):
+                    with open(self.path(name + suffix), 'rb') as content:
+                        encodings[coding] = content.read()
+            blobs[name] = Blob(name, encodings)
+        return Snapshot(generation, {key: blobs[name] for key, name in manifest['pages'].items()})
+
+
+def get_snapshot_store():
+    store = getattr(settings, 'MENU_SNAPSHOT_STORE', None)
+    if not store:
+        return None
+    if store == 'cache':
+        return CacheSnapshotStore()
+    return FileSnapshotStore(store)
+
+
+# A missing snapshot is looked for again after this many seconds, not on
+# every request, while it is being published.
+SNAPSHOT_MISS_RETRY = 1
+
+_loaded = (None, None, 0)
+_lock = threading.Lock()
+
+def get_snapshot():
+    """The published snapshot for the current menu generation, if there is one.
+
+    The generation lives in the shared menu cache (see checks.py), so every
+    worker accepts the snapshot any of them published. It is loaded from
+    the store once per generation and then served from process memory,
+    re-checking the store every MENU_SNAPSHOT_TIMEOUT seconds so a snapshot
+    replaced or dropped elsewhere is not served forever. A missing snapshot
+    is republished in the background.
+    """
+    global _loaded
+    store = get_snapshot_store()
+    if store is None:
+        return None
+    generation = get_menu_generation()
+    loadedGeneration, snapshot, loadedAt = _loaded
+    maxAge = snapshot_timeout() if snapshot is not None else SNAPSHOT_MISS_RETRY
+    if loadedGeneration != generation or time.monotonic() - loadedAt > maxAge:
+        snapshot = store.load(generation)
+        with _lock:
+            _loaded = (generation, snapshot, time.monotonic())
+        if snapshot is None:
+            publisher.request()
+    return snapshot
+
+def publish_menu():
+    """Compile the menu and publish it to the configured store."""
+    store = get_snapshot_store()
+    if store is None:
+        return None
+    snapshot = compile_snapshot()
+    store.save(snapshot)
+    return snapshot
+
+def publish_if_stale():
+    store = get_snapshot_store()
+    if store is not None and not store.published(get_menu_generation()):
+        publish_menu()
+
+
+class BackgroundPublisher:
+    """Republishes on a worker thread, coalescing requests made meanwhile.
+
+    Compiling a large menu takes seconds, so writers only flag the snapshot
+    as stale; a burst of writes leads to one or two publishes, not one each.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = False
+        self.running = False
+
+    def request(self):
+        with self.lock:
+            self.pending = True
+            if self.running:
+                return
+            self.running = True
+        threading.Thread(target=self.run, name='menu-snapshot-publisher', daemon=True).start()
+
+    def run(self):
+        try:
+            while True:
+                with self.lock:
+                    if not self.pending:
+                        self.running = False
+                        return
+                    self.pending = False
+                try:
+                    publish_if_stale()
+                except Exception:
+                    logger.exception('Publishing the menu snapshot failed')
+        finally:
+            connections.close_all()
+
+publisher = BackgroundPublisher()
+
+def schedule_publish():
+    """Republish in the background once the current transaction commits."""
+    if get_snapshot_store() is not None and getattr(settings, 'MENU_SNAPSHOT_PUBLISH_ON_WRITE', True):
+        transaction.on_commit(publisher.request)
+
+
+def snapshot_response(request, query_params):
+    """Serve an unfiltered menu list request from the snapshot, or return None."""
+    snapshot = get_snapshot()
+    blob = snapshot.blob_for(query_params) if snapshot is not None else None
+    if blob is None:
+        return None
+    mixin = ConditionalGetMixin()
+    notModified = mixin.not_modified(request, etag=blob.etag)
+    if notModified:
+        notModified['Vary'] = 'Accept-Encoding'
+        return notModified
+    coding = blob.encoding_for(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    response = HttpResponse(blob.encodings[coding], content_type='application/json')
+    if coding != 'identity':
+        response['Content-Encoding'] = coding
+    response['Vary'] = 'Accept-Encoding'
+    response['Content-Length'] = str(len(blob.encodings[coding]))
+    return mixin.with_validators(response, etag=blob.etag)
@@ -0,0 +1,29 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+class EndpointQueryCountMixin:
+    """TestCase mixin for pinning the number of queries an endpoint runs.
+
+    The count must stay the same whatever the size of the page, which is
+    what catches an N+1 introduced by a new nested serializer field::
+
+        self.assertEndpointQueries(3, 'get', '/api/cart/menu-items', user=customer)
+    """
+
+    def assertEndpointQueries(self, num, method, path, user=None, data=None, **extra):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(path, data, format='json', **extra)
+        executed = len(context.captured_queries)
+        self.assertEqual(
+            executed, num,
+            '%s %s ran %d queries, expected %d:\n%s' % (
+                method.upper(), path, executed, num,
+                '\n'.join(query['sql'] for query in context.captured_queries),
+            )
+        )
+        return response
@@ -1,3 +1,1050 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, router
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, \
+    override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from .models import Category, MenuItem, Cart, CartSummary, Order, OrderItem, DailySales, DailyMenuItemSales, \
+    DailyCrewDeliveries, OffShift
+from .checkout import checkout
+from .assignment import pick_crew
+from .roles import MANAGER, DELIVERY_CREW, get_role_member_ids
+from . import async_views, events, search, snapshots, throttling
+from .cache import get_menu_generation, bump_menu_generation, cached_menu_response
+from .snapshots import FileSnapshotStore
+from .search import InMemorySearchBackend
+from .routers import REPLICA, replica_reads, primary_reads, reading_from_replica
+from .views import MenuItemView
+from .query_audit import audited_queries
+from .testing import EndpointQueryCountMixin
+from .checks import check_menu_cache, check_snapshot_store, check_auth_caches
+from .tokens import token_cache
+from .exports import CSV_HEADER, iter_orders
+from .profiling import ProfilingMiddleware, SlowestRequests, get_slowest
+from .throttling import UserThrottle
+
+
+@override_settings(
+    REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={'anon': None, 'user': None}),
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}},
+    MENU_SNAPSHOT_STORE=None,
+)
+class LittleLemonTestCase(TestCase):
+    """Menu, users in every role and clients for them; caches start empty."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager')
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.crew = User.objects.create_user('crew')
+        cls.crew.groups.add(Group.objects.create(name=DELIVERY_CREW))
+        cls.customer = User.objects.create_user('customer')
+        cls.mains = Category.objects.create(slug='mains', title='Mains')
+        cls.desserts = Category.objects.create(slug='desserts', title='Desserts')
+        cls.menuItems = [
+            MenuItem.objects.create(title='Item %d' % index, price=index + 1, featured=bool(index % 2),
+                                    category=cls.mains if index < 8 else cls.desserts)
+            for index in range(12)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def add_order(self, user, delivery_crew=None, status=False, lines=2):
+        order = Order.objects.create(user=user, delivery_crew=delivery_crew, status=status,
+                                     total=0, date=datetime.date(2024, 1, 1))
+        for menuItem in self.menuItems[:lines]:
+            OrderItem.objects.create(order=order, menuitem=menuItem, quantity=2,
+                                     unit_price=menuItem.price, price=menuItem.price * 2)
+        return order
+
+
+class ReaderParityTests(LittleLemonTestCase):
+    """The values_list readers must render exactly what the serializers do."""
+
+    def render(self, user, path, fast):
+        with self.settings(FAST_READ_SERIALIZERS=fast):
+            cache.clear()
+            response = self.client_for(user).get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.content
+
+    def assertParity(self, user, path):
+        self.assertEqual(self.render(user, path, True), self.render(user, path, False), path)
+
+    def test_menu_items(self):
+        self.assertParity(self.customer, '/api/menu_items/?perpage=20')
+        self.assertParity(self.customer, '/api/menu_items/?perpage=5&page=2&category=Mains')
+        self.assertParity(self.customer, '/api/menu_items/?featured=1&perpage=3')
+
+    def test_orders(self):
+        self.add_order(self.customer, delivery_crew=self.crew, status=True)
+        self.add_order(self.customer)
+        self.assertParity(self.manager, '/api/orders/?perpage=10')
+        self.assertParity(self.customer, '/api/orders/?perpage=10')
+        self.assertParity(self.crew, '/api/orders/?perpage=10')
+
+    def test_cart(self):
+        for menuItem in self.menuItems[:3]:
+            Cart.objects.create(user=self.customer, menuitem=menuItem, quantity=2,
+                                unit_price=menuItem.price, price=menuItem.price * 2)
+        self.assertParity(self.customer, '/api/cart/menu-items?perpage=10')
+
+
+
+class ListQueryCountTests(EndpointQueryCountMixin, LittleLemonTestCase):
+    """List endpoints run the same number of queries whatever the page size."""
+
+    def setUp(self):
+        super().setUp()
+        for user in (self.customer, self.manager):
+            for index in range(10):
+                self.add_order(user, delivery_crew=self.crew if index % 2 else None)
+        for menuItem in self.menuItems:
+            Cart.objects.create(user=self.customer, menuitem=menuItem, quantity=1,
+                                unit_price=menuItem.price, price=menuItem.price)
+
+    def assertListQueries(self, num, path, user):
+        for fast in (True, False):
+            for perpage in (2, 10):
+                with self.subTest(fast=fast, perpage=perpage), self.settings(FAST_READ_SERIALIZERS=fast):
+                    cache.clear()
+                    response = self.assertEndpointQueries(num, 'get', path % perpage, user=user)
+                    self.assertEqual(len(response.json()), perpage)
+
+    def test_cart(self):
+        # Roles, COUNT, page.
+        self.assertListQueries(3, '/api/cart/menu-items?perpage=%d', self.customer)
+
+    def test_orders(self):
+        self.assertListQueries(3, '/api/orders/?perpage=%d', self.manager)
+        self.assertListQueries(3, '/api/orders/?perpage=%d', self.customer)
+
+    def test_menu_items(self):
+        # COUNT, page; menu reads need no roles.
+        self.assertListQueries(2, '/api/menu_items/?perpage=%d', self.customer)
+
+
+class CheckoutTests(LittleLemonTestCase):
+
+    def fill_cart(self, client):
+        for menuItem, quantity in zip(self.menuItems[:3], (1, 2, 3)):
+            response = client.post('/api/cart/menu-items', {'menuitem_id': menuItem.pk, 'quantity': quantity})
+            self.assertEqual(response.status_code, 201, response.content)
+
+    def test_checkout_moves_cart_into_order(self):
+        client = self.client_for(self.customer)
+        self.fill_cart(client)
+        response = client.post('/api/orders/')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        order = Order.objects.get(user=self.customer)
+        # 1*1 + 2*2 + 3*3
+        self.assertEqual(order.total, Decimal('14.00'))
+        self.assertEqual(order.delivery_crew, self.crew)
+        self.assertEqual(
+            sorted(OrderItem.objects.filter(order=order).values_list('menuitem', 'quantity', 'price')),
+            [(self.menuItems[0].pk, 1, Decimal('1.00')), (self.menuItems[1].pk, 2, Decimal('4.00')),
+             (self.menuItems[2].pk, 3, Decimal('9.00'))],
+        )
+        self.assertFalse(Cart.objects.filter(user=self.customer).exists())
+        summary = CartSummary.objects.get(user=self.customer)
+        self.assertEqual((summary.item_count, summary.subtotal), (0, 0))
+        self.assertEqual(DailySales.objects.get(date=order.date).revenue, Decimal('14.00'))
+
+    def test_failed_checkout_leaves_cart_untouched(self):
+        self.fill_cart(self.client_for(self.customer))
+        with mock.patch('LittleLemonAPI.checkout.record_order', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                checkout(self.customer)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 3)
+        self.assertEqual(CartSummary.objects.get(user=self.customer).item_count, 6)
+
+
+class CartSummaryTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.customer)
+        for menuItem in self.menuItems[:2]:
+            self.client.post('/api/cart/menu-items', {'menuitem_id': menuItem.pk, 'quantity': 2})
+
+    def summary(self):
+        return self.client.get('/api/cart/summary').json()
+
+    def test_adding_lines_counts_them(self):
+        # 2*1 + 2*2
+        self.assertEqual(self.summary(), {'item_count': 4, 'subtotal': '6.00'})
+
+    def test_price_change_reprices_lines(self):
+        menuItem = self.menuItems[1]
+        menuItem.price = 5
+        menuItem.save()
+        self.assertEqual(Cart.objects.get(user=self.customer, menuitem=menuItem).price, Decimal('10.00'))
+        self.assertEqual(self.summary(), {'item_count': 4, 'subtotal': '12.00'})
+
+    def test_deleting_menu_item_drops_its_lines(self):
+        self.menuItems[0].delete()
+        self.assertEqual(self.summary(), {'item_count': 2, 'subtotal': '4.00'})
+
+    def test_clearing_cart_resets_summary(self):
+        self.client.delete('/api/cart/menu-items')
+        self.assertEqual(self.summary(), {'item_count': 0, 'subtotal': '0.00'})
+
+
+class IdempotencyTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.customer)
+        self.line = {'menuitem_id': self.menuItems[0].pk, 'quantity': 1}
+
+    def test_retry_replays_first_response(self):
+        first = self.client.post('/api/cart/menu-items', self.line, HTTP_IDEMPOTENCY_KEY='k1')
+        retry = self.client.post('/api/cart/menu-items', self.line, HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Cart.objects.get(user=self.customer).quantity, 1)
+
+    def test_checkout_runs_once(self):
+        self.client.post('/api/cart/menu-items', self.line)
+        first = self.client.post('/api/orders/', HTTP_IDEMPOTENCY_KEY='order-1')
+        retry = self.client.post('/api/orders/', HTTP_IDEMPOTENCY_KEY='order-1')
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(first.json(), retry.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_with_other_body_is_rejected(self):
+        self.client.post('/api/cart/menu-items', self.line, HTTP_IDEMPOTENCY_KEY='k1')
+        response = self.client.post('/api/cart/menu-items', dict(self.line, quantity=3), HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(response.status_code, 422)
+
+    def test_keys_are_per_user(self):
+        self.client.post('/api/cart/menu-items', self.line, HTTP_IDEMPOTENCY_KEY='k1')
+        other = User.objects.create_user('other')
+        response = self.client_for(other).post('/api/cart/menu-items', self.line, HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Cart.objects.count(), 2)
+
+
+class CartChangeTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.customer)
+        self.first, self.second, self.third = [menuItem.pk for menuItem in self.menuItems[:3]]
+        self.client.post('/api/cart/menu-items', {'menuitem_id': self.first, 'quantity': 2})
+
+    def lines(self):
+        return dict(Cart.objects.filter(user=self.customer).values_list('menuitem', 'quantity'))
+
+    def batch(self, operations):
+        return self.client.post('/api/cart/menu-items/batch', operations, format='json')
+
+    def assertBatchApplies(self):
+        response = self.batch([
+            {'menuitem_id': self.first, 'quantity_delta': 3},
+            {'menuitem_id': self.second, 'quantity_delta': 1},
+            {'menuitem_id': self.second, 'quantity_delta': 1},
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.lines(), {self.first: 5, self.second: 2})
+        # 5*1 + 2*2
+        self.assertEqual(response.json()['summary'], {'item_count': 7, 'subtotal': '9.00'})
+
+    def test_batch_adds_deltas(self):
+        self.assertBatchApplies()
+
+    def test_batch_without_upsert_target(self):
+        # MySQL cannot name the conflict target of an upsert.
+        with mock.patch.object(type(connection.features), 'supports_update_conflicts_with_target', False):
+            self.assertBatchApplies()
+
+    def test_batch_removes_lines_at_zero(self):
+        response = self.batch({'items': [{'menuitem_id': self.first, 'quantity_delta': -5}]})
+        self.assertEqual(response.json()['removed'], [self.first])
+        self.assertEqual(self.lines(), {})
+        self.assertEqual(response.json()['summary'], {'item_count': 0, 'subtotal': '0.00'})
+
+    def test_batch_is_all_or_nothing(self):
+        response = self.batch([
+            {'menuitem_id': self.second, 'quantity_delta': 1},
+            {'menuitem_id': 999999, 'quantity_delta': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.lines(), {self.first: 2})
+
+    def test_patch_sets_quantity(self):
+        response = self.client.patch('/api/cart/menu-items/%d' % self.first, {'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.lines(), {self.first: 4})
+        response = self.client.patch('/api/cart/menu-items/%d' % self.third, {'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_removes_one_line(self):
+        self.batch([{'menuitem_id': self.second, 'quantity_delta': 1}])
+        self.assertEqual(self.client.delete('/api/cart/menu-items/%d' % self.first).status_code, 200)
+        self.assertEqual(self.lines(), {self.second: 1})
+        self.assertEqual(self.client.delete('/api/cart/menu-items/%d' % self.first).status_code, 404)
+
+
+class CrewShiftTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.otherCrew = User.objects.create_user('other-crew')
+        self.otherCrew.groups.add(Group.objects.get(name=DELIVERY_CREW))
+        self.manager_client = self.client_for(self.manager)
+
+    def shift(self, method, crew, data=None):
+        return getattr(self.manager_client, method)(
+            '/api/groups/delivery_crew/users/%d/shift' % crew.pk, data, format='json')
+
+    def test_off_shift_crew_get_no_orders(self):
+        self.assertEqual(self.shift('delete', self.crew).status_code, 200)
+        # Shift state lives in the database, not in one process's cache.
+        cache.clear()
+        self.assertEqual(pick_crew(), self.otherCrew.pk)
+        self.assertEqual(self.shift('delete', self.otherCrew).status_code, 200)
+        self.assertIsNone(pick_crew())
+        self.assertEqual(self.shift('post', self.crew).status_code, 200)
+        self.assertEqual(pick_crew(), self.crew.pk)
+
+    def test_ending_shift_hands_orders_on(self):
+        order = self.add_order(self.customer, delivery_crew=self.crew)
+        response = self.shift('delete', self.crew, {'to': self.otherCrew.pk})
+        self.assertEqual(response.json()['reassigned'], {str(self.otherCrew.pk): 1})
+        order.refresh_from_db()
+        self.assertEqual(order.delivery_crew, self.otherCrew)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.shift('delete', self.crew, {'to': 'abc'}).status_code, 400)
+        self.assertEqual(self.shift('delete', self.crew, {'to': self.customer.pk}).status_code, 400)
+        self.assertEqual(self.shift('delete', self.customer).status_code, 404)
+        self.assertEqual(self.shift('post', self.customer).status_code, 404)
+        self.assertFalse(OffShift.objects.exists())
+
+
+class MenuCacheTests(LittleLemonTestCase):
+
+    def test_generation_moves_on_commit(self):
+        generation = get_menu_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.menuItems[0].save()
+            self.assertEqual(get_menu_generation(), generation)
+        self.assertEqual(get_menu_generation(), generation + 1)
+
+    def test_list_etag_follows_menu_writes(self):
+        client = self.client_for(self.customer)
+        response = client.get('/api/menu_items/')
+        self.assertIn('Accept', response['Vary'])
+        etag = response['ETag']
+        self.assertEqual(client.get('/api/menu_items/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Other workers' generations do not matter: the ETag names the content.
+        cache.clear()
+        self.assertEqual(client.get('/api/menu_items/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(self.manager).put('/api/menu_items/%d/' % self.menuItems[0].pk, {
+                'title': 'Item 0', 'price': '9.50', 'featured': False, 'category_id': self.mains.pk}, format='json')
+            self.assertEqual(response.status_code, 200)
+        response = client.get('/api/menu_items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_snapshot_follows_the_shared_generation(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(MENU_SNAPSHOT_STORE=directory), \
+                mock.patch.object(snapshots.publisher, 'request') as republish, \
+                mock.patch.object(snapshots, '_loaded', (None, None, 0)):
+            published = snapshots.publish_menu()
+            self.assertEqual(snapshots.get_snapshot().hash, published.hash)
+            # A worker that has loaded nothing yet reads the same generation.
+            snapshots._loaded = (None, None, 0)
+            self.assertEqual(snapshots.get_snapshot().hash, published.hash)
+            republish.assert_not_called()
+
+            bump_menu_generation()
+            self.assertIsNone(FileSnapshotStore(directory).load(get_menu_generation()))
+            self.assertIsNone(snapshots.get_snapshot())
+            republish.assert_called_once()
+            response = self.client_for(self.customer).get('/api/menu_items/')
+            self.assertNotIn('m-', response['ETag'])
+
+    def test_cache_fills_read_from_primary(self):
+        with replica_reads():
+            self.assertEqual(cached_menu_response('fill', lambda: [reading_from_replica.get()])[1], [False])
+            self.assertTrue(reading_from_replica.get())
+
+
+@override_settings(TOKEN_CACHE_TIMEOUT=300, ROLE_CACHE_TIMEOUT=300)
+class TokenCacheTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.token = Token.objects.create(user=self.customer)
+        self.client = APIClient(HTTP_AUTHORIZATION='Token %s' % self.token.key)
+
+    def test_role_change_forgets_token(self):
+        self.assertEqual(self.client.get('/api/orders/').status_code, 200)
+        self.assertIsNotNone(token_cache.get(self.token.key))
+        self.customer.groups.add(Group.objects.get(name=MANAGER))
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.client.get('/api/groups/manager/users/').status_code, 200)
+
+    def test_deleted_token_is_refused(self):
+        self.assertEqual(self.client.get('/api/orders/').status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/orders/').status_code, 401)
+
+    @override_settings(TOKEN_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.assertEqual(self.client.get('/api/orders/').status_code, 200)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+
+class CursorTests(LittleLemonTestCase):
+
+    def test_tampered_cursors_are_rejected(self):
+        client = self.client_for(self.manager)
+        self.add_order(self.customer)
+        # [[], []], [1, "x"], ["notadate", 1] and a cursor that is not base64
+        for path, cursor in [('/api/menu_items/', 'W1tdLFtdXQ'), ('/api/menu_items/', 'WzEsIngiXQ'),
+                             ('/api/orders/', 'WyJub3RhZGF0ZSIsMV0'), ('/api/orders/', '!!!')]:
+            response = client.get(path, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, (path, cursor))
+            self.assertEqual(response.json(), {'cursor': 'Cursor invalid'})
+
+    def test_cursor_walks_the_menu(self):
+        client = self.client_for(self.customer)
+        titles, cursor = [], ''
+        while cursor is not None:
+            page = client.get('/api/menu_items/', {'cursor': cursor, 'perpage': 5}).json()
+            titles += [menuItem['title'] for menuItem in page['results']]
+            cursor = page['next_cursor']
+        self.assertEqual(sorted(titles), sorted(menuItem.title for menuItem in self.menuItems))
+
+
+class SearchTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # A fresh index per test: rolled back rows never reach the signals.
+        self.backend = InMemorySearchBackend()
+        patcher = mock.patch.object(search, 'search_backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def titles(self, **params):
+        response = self.client_for(self.customer).get('/api/menu_items/', dict(params, perpage=20))
+        self.assertEqual(response.status_code, 200, response.content)
+        return [menuItem['title'] for menuItem in response.json()]
+
+    def test_exact_matches_rank_first(self):
+        self.assertEqual(self.titles(search='item 1'), ['Item 1', 'Item 10', 'Item 11'])
+
+    def test_filters_apply_in_the_index(self):
+        self.assertEqual(self.titles(search='item', category='Mains', to_price='5', featured='1'),
+                         ['Item 1', 'Item 3'])
+        self.assertEqual(self.titles(search='item', category='Nothing'), [])
+
+    def test_pages_and_counts_come_from_the_ranking(self):
+        results = self.backend.filter(MenuItem.objects.all(), 'item')
+        with self.assertNumQueries(0):
+            self.assertEqual(results.count(), 12)
+        with self.assertNumQueries(1):
+            self.assertEqual([menuItem.title for menuItem in results[2:4]], ['Item 2', 'Item 3'])
+
+    def test_index_follows_writes(self):
+        self.assertIn('Item 0', self.titles(search='item', to_price='5'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.menuItems[0].price = '50.00'
+            self.menuItems[0].save()
+            self.menuItems[1].delete()
+        titles = self.titles(search='item', to_price='5')
+        self.assertNotIn('Item 0', titles)
+        self.assertNotIn('Item 1', titles)
+        self.assertIn('Item 0', self.titles(search='item', to_price='50'))
+
+
+class ReplicaRoutingTests(LittleLemonTestCase):
+    """Which alias queries go to once DB_REPLICA_NAME adds a second SQLite database.
+
+    The alias mirrors the test database, as in build_databases(); the
+    assertions are on the alias a query would use, so it is never opened.
+    """
+
+    def setUp(self):
+        super().setUp()
+        replica = dict(connections.settings['default'], TEST={'MIRROR': 'default'})
+        patcher = mock.patch.dict(connections.settings, {REPLICA: replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_inside_replica_reads_use_the_replica(self):
+        self.assertEqual(MenuItem.objects.all().db, 'default')
+        with replica_reads():
+            self.assertEqual(MenuItem.objects.all().db, REPLICA)
+            self.assertEqual(Order.objects.filter(user=self.customer).db, REPLICA)
+            with primary_reads():
+                self.assertEqual(MenuItem.objects.all().db, 'default')
+
+    def test_writes_locks_and_auth_use_the_primary(self):
+        with replica_reads():
+            self.assertEqual(Order.objects.select_for_update().db, 'default')
+            self.assertEqual(router.db_for_write(Order), 'default')
+            self.assertEqual(router.db_for_write(MenuItem), 'default')
+            self.assertEqual(User.objects.all().db, 'default')
+            self.assertEqual(Token.objects.all().db, 'default')
+
+    def test_viewsets_read_from_the_replica_for_get_only(self):
+        def read_alias(view, request, pk=None):
+            return Response({'db': MenuItem.objects.all().db})
+
+        path = '/api/menu_items/%d/' % self.menuItems[0].pk
+        client = self.client_for(self.manager)
+        with mock.patch.object(MenuItemView, 'retrieve', read_alias), \
+                mock.patch.object(MenuItemView, 'update', read_alias):
+            self.assertEqual(client.get(path).json(), {'db': REPLICA})
+            self.assertEqual(client.put(path, {}, format='json').json(), {'db': 'default'})
+
+
+class AsyncReadParityTests(LittleLemonTestCase):
+    """The async_views handlers answer byte for byte what the ViewSets do.
+
+    They are called directly, since urls.py only mounts them for the
+    ASYNC_READ_ROUTES named when it is imported.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tokens = {user: Token.objects.create(user=user).key
+                       for user in (self.manager, self.crew, self.customer)}
+        for menuItem in self.menuItems[:3]:
+            Cart.objects.create(user=self.customer, menuitem=menuItem, quantity=2,
+                                unit_price=menuItem.price, price=menuItem.price * 2)
+        self.order = self.add_order(self.customer, delivery_crew=self.crew, status=True)
+        self.add_order(self.customer)
+
+    def headers(self, user):
+        if user is None:
+            return {}
+        return {'Authorization': 'Token %s' % self.tokens.get(user, user)}
+
+    def sync_get(self, user, path):
+        cache.clear()
+        response = APIClient().get(path, headers=self.headers(user))
+        return response.status_code, response.content
+
+    def async_get(self, view, user, path, **kwargs):
+        cache.clear()
+        request = AsyncRequestFactory().get(path, headers=self.headers(user))
+        # An anonymous session, as SessionMiddleware would attach.
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        response = async_to_sync(view)(request, **kwargs)
+        return response.status_code, response.content
+
+    def assertParity(self, view, user, path, **kwargs):
+        expected = self.sync_get(user, path)
+        self.assertEqual(self.async_get(view, user, path, **kwargs), expected, path)
+        return expected[0]
+
+    def test_menu_items(self):
+        for path in ['/api/menu_items/', '/api/menu_items/?perpage=5&page=2',
+                     '/api/menu_items/?category=Mains&featured=1&perpage=10', '/api/menu_items/?page=99']:
+            self.assertEqual(self.assertParity(async_views.menu_items_list, self.customer, path), 200)
+        menuItem = self.menuItems[3]
+        self.assertEqual(self.assertParity(async_views.menu_items_retrieve, self.customer,
+                                           '/api/menu_items/%d/' % menuItem.pk, pk=menuItem.pk), 200)
+        self.assertEqual(self.assertParity(async_views.menu_items_retrieve, self.customer,
+                                           '/api/menu_items/0/', pk=0), 404)
+
+    def test_cart(self):
+        self.assertEqual(self.assertParity(async_views.cart_list, self.customer,
+                                           '/api/cart/menu-items?perpage=10'), 200)
+
+    def test_orders(self):
+        for user in (self.manager, self.crew, self.customer):
+            self.assertEqual(self.assertParity(async_views.orders_list, user, '/api/orders/?perpage=10'), 200)
+        path = '/api/orders/%d/' % self.order.pk
+        self.assertEqual(self.assertParity(async_views.orders_retrieve, self.customer, path, pk=self.order.pk), 200)
+        # Only the customer who placed the order can read it here.
+        self.assertEqual(self.assertParity(async_views.orders_retrieve, self.manager, path, pk=self.order.pk), 401)
+
+    def test_unauthenticated_requests_are_refused(self):
+        for view, path in [(async_views.menu_items_list, '/api/menu_items/'),
+                           (async_views.cart_list, '/api/cart/menu-items'),
+                           (async_views.orders_list, '/api/orders/')]:
+            for user in (None, 'not-a-token'):
+                self.assertEqual(self.assertParity(view, user, path), 401, (path, user))
+
+    def test_cart_is_for_customers_only(self):
+        for user in (self.manager, self.crew):
+            self.assertEqual(self.assertParity(async_views.cart_list, user, '/api/cart/menu-items'), 403)
+
+
+class OrderExportTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.delivered = self.add_order(self.customer, delivery_crew=self.crew, status=True)
+        self.open = self.add_order(self.customer, lines=3)
+        self.empty = self.add_order(self.manager, lines=0)
+
+    def export(self, user, **params):
+        response = self.client_for(user).get('/api/orders/export', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, body = self.export(self.manager)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        orders = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([order['id'] for order in orders], [self.delivered.pk, self.open.pk, self.empty.pk])
+        self.assertEqual(orders[0]['delivery_crew'], {'id': self.crew.pk, 'username': 'crew'})
+        self.assertEqual(orders[0]['items'][1], {'menuitem_id': self.menuItems[1].pk, 'menuitem': 'Item 1',
+                                                 'quantity': 2, 'unit_price': '2.00', 'price': '4.00'})
+        self.assertEqual([len(order['items']) for order in orders], [2, 3, 0])
+
+    def test_csv_has_a_row_per_item(self):
+        response, body = self.export(self.manager, output='csv', status=0)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('orders.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], CSV_HEADER)
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.open.pk)] * 3 + [str(self.empty.pk)])
+        # An order without items still gets one row, with the item columns blank.
+        self.assertEqual(rows[-1][-5:], [''] * 5)
+
+    def test_filters(self):
+        response, body = self.export(self.manager, delivery_crew=self.crew.pk)
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], [self.delivered.pk])
+
+    def test_chunks_cover_every_order(self):
+        for index in range(3):
+            self.add_order(self.customer, lines=1)
+        orders = Order.objects.all()
+        self.assertEqual([order.pk for order in iter_orders(orders, chunk_size=2)],
+                         list(orders.order_by('pk').values_list('pk', flat=True)))
+
+    def test_managers_only(self):
+        for user in (self.crew, self.customer):
+            response = self.client_for(user).get('/api/orders/export')
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.json(), {'message': 'Unauthorized User'})
+
+
+class ProfilingTests(LittleLemonTestCase):
+
+    def test_off_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: None)
+        response = self.client_for(self.customer).get('/api/orders/')
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PROFILING_ENABLED=True)
+    def test_requests_are_timed(self):
+        # A new client loads the middleware under the setting above.
+        with self.assertLogs('LittleLemonAPI.profiling', 'INFO') as logs:
+            response = self.client_for(self.customer).get('/api/orders/')
+        self.assertRegex(response['Server-Timing'], r'^sql;dur=[\d.]+;desc="\d+ queries", serializer;dur=')
+        self.assertIn('total;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['status']), ('OrdersView.list', 200))
+        self.assertGreater(record['queries'], 0)
+        self.assertEqual(get_slowest().snapshot(), [record])
+
+    @override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_timed(self):
+        response = self.client_for(self.customer).get('/api/orders/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(get_slowest().snapshot(), [])
+
+    @override_settings(PROFILING_ENABLED=True)
+    def test_slowest_is_for_managers_only(self):
+        self.client_for(self.customer).get('/api/orders/')
+        self.assertEqual(self.client_for(self.customer).get('/api/profiling/slowest').status_code, 403)
+        client = self.client_for(self.manager)
+        records = client.get('/api/profiling/slowest').json()
+        self.assertEqual(sorted((record['view'], record['status']) for record in records),
+                         [('OrdersView.list', 200), ('ProfilingView.slowest', 403)])
+        self.assertEqual(client.delete('/api/profiling/slowest').status_code, 204)
+        # Only the DELETE itself, recorded once it had cleared the rest.
+        self.assertEqual([record['view'] for record in get_slowest().snapshot()], ['ProfilingView.clear'])
+
+    def test_slowest_keeps_the_slowest(self):
+        slowest = SlowestRequests(2)
+        for total in (5, 1, 9, 3):
+            slowest.add({'total_ms': total})
+        self.assertEqual(slowest.snapshot(), [{'total_ms': 9}, {'total_ms': 5}])
+
+
+@override_settings(ROLE_CACHE_TIMEOUT=300)
+class RoleBulkTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.users = [User.objects.create_user('user%d' % index) for index in range(3)]
+        self.userIds = [user.pk for user in self.users]
+        self.client = self.client_for(self.manager)
+
+    def members(self, name):
+        return set(User.objects.filter(groups__name=name).values_list('pk', flat=True))
+
+    def test_bulk_add_and_remove(self):
+        response = self.client.post('/api/groups/delivery_crew/users/bulk',
+                                    {'users': self.userIds + self.userIds[:1]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'message': 'Added 3 users to %s group' % DELIVERY_CREW})
+        self.assertEqual(self.members(DELIVERY_CREW), {self.crew.pk, *self.userIds})
+        # Adding members again is a no-op, not an integrity error.
+        response = self.client.post('/api/groups/delivery_crew/users/bulk', {'users': self.userIds}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.delete('/api/groups/delivery_crew/users/bulk',
+                                      {'users': self.userIds[:2] + [self.customer.pk]}, format='json')
+        self.assertEqual(response.json(), {'message': 'Removed 2 users from %s group' % DELIVERY_CREW})
+        self.assertEqual(self.members(DELIVERY_CREW), {self.crew.pk, self.userIds[2]})
+
+    def test_unknown_users_change_nothing(self):
+        for method in ('post', 'delete'):
+            response = getattr(self.client, method)('/api/groups/manager/users/bulk',
+                                                    {'users': self.userIds + [0, -1]}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'message': 'Unknown users', 'users': [-1, 0]})
+            self.assertEqual(self.members(MANAGER), {self.manager.pk})
+        response = self.client.post('/api/groups/manager/users/bulk', {'users': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_changes_reach_cached_roles(self):
+        user = self.users[0]
+        client = self.client_for(user)
+        self.assertEqual(client.get('/api/groups/manager/users/').status_code, 403)
+        self.assertNotIn(user.pk, get_role_member_ids(MANAGER))
+        self.client.post('/api/groups/manager/users/bulk', {'users': [user.pk]}, format='json')
+        self.assertEqual(client.get('/api/groups/manager/users/').status_code, 200)
+        self.assertIn(user.pk, get_role_member_ids(MANAGER))
+        self.client.delete('/api/groups/manager/users/bulk', {'users': [user.pk]}, format='json')
+        self.assertEqual(client.get('/api/groups/manager/users/').status_code, 403)
+        self.assertNotIn(user.pk, get_role_member_ids(MANAGER))
+
+    def test_managers_only(self):
+        for user in (self.crew, self.customer):
+            response = self.client_for(user).post('/api/groups/manager/users/bulk',
+                                                  {'users': self.userIds}, format='json')
+            self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.members(MANAGER), {self.manager.pk})
+
+
+class QueryAuditTests(LittleLemonTestCase):
+
+    def test_crew_queries_need_an_assigned_order(self):
+        self.add_order(self.customer)
+        names = [name for name, queryset in audited_queries()]
+        self.assertIn('orders.list.customer', names)
+        self.assertNotIn('orders.list.crew', names)
+        self.add_order(self.customer, delivery_crew=self.crew)
+        self.assertIn('orders.list.crew', [name for name, queryset in audited_queries()])
+
+
+@override_settings(ORDER_EVENTS_STREAM_TIMEOUT=0)
+class OrderEventsTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(events, 'order_events', events.LocalOrderEvents())
+        self.hub = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def stream(self, user, lastEventId):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        response = await client.get('/api/orders/events', headers={'Last-Event-ID': lastEventId})
+        if not response.streaming:
+            return response, ''
+        return response, b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_replay_after_last_event_id(self):
+        mine = await Order.objects.acreate(user=self.customer, total=0, date=datetime.date(2024, 1, 1))
+        other = await Order.objects.acreate(user=self.manager, total=0, date=datetime.date(2024, 1, 1))
+        for order in (mine, other, mine):
+            self.hub.publish(events.order_event(order))
+        response, body = await self.stream(self.customer, '1')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        # Only the customer's own order after event 1: event 3.
+        self.assertNotIn('id: 2\n', body)
+        self.assertIn('id: 3\nevent: order\ndata: {"order": %d, ' % mine.pk, body)
+        response, body = await self.stream(self.manager, '1')
+        self.assertIn('id: 2\n', body)
+        self.assertIn('id: 3\n', body)
+
+    async def test_bad_last_event_id(self):
+        for value in ('abc', '-1'):
+            response, body = await self.stream(self.customer, value)
+            self.assertEqual(response.status_code, 400, value)
+
+    def test_empty_log_asks_for_reset(self):
+        self.assertIsNone(self.hub.events_after(-1))
+        self.assertEqual(self.hub.events_after(0), [])
+
+
+class MenuImportTests(LittleLemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.manager)
+
+    def post(self, data, content_type='application/json'):
+        return self.client.generic('POST', '/api/menu_items/bulk', data, content_type)
+
+    def test_json_creates_and_updates(self):
+        response = self.client.post('/api/menu_items/bulk', {'items': [
+            {'title': 'Soup', 'price': '4.00', 'featured': False, 'category_id': self.mains.pk},
+            {'id': self.menuItems[0].pk, 'title': 'Item 0', 'price': '7.00', 'featured': True,
+             'category_id': self.mains.pk},
+        ]}, format='json')
+        self.assertEqual(response.json(), {'created': 1, 'updated': 1})
+        self.assertEqual(MenuItem.objects.get(pk=self.menuItems[0].pk).price, Decimal('7.00'))
+        self.assertTrue(MenuItem.objects.filter(title='Soup').exists())
+
+    def test_csv_mixes_new_rows_and_updates(self):
+        response = self.post(
+            'id,title,price,featured,category_id\n'
+            ',Soup,4.00,False,%d\n'
+            '%d,Item 0,7.00,True,%d\n' % (self.mains.pk, self.menuItems[0].pk, self.mains.pk), 'text/csv')
+        self.assertEqual(response.json(), {'created': 1, 'updated': 1})
+
+    def test_bad_uploads(self):
+        self.assertEqual(self.post('title\n\xe9t\xe9\n'.encode('latin-1'), 'text/csv').status_code, 400)
+        self.assertEqual(self.post('{"title": "Soup"}').status_code, 400)
+        self.assertEqual(self.post('"Soup"').status_code, 400)
+        response = self.post('[{"title": "Soup", "price": "4.00", "featured": false, "category_id": %d},'
+                             ' {"title": "Bad", "price": "x", "featured": false, "category_id": 999}]' % self.mains.pk)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [1])
+        self.assertFalse(MenuItem.objects.filter(title='Soup').exists())
+
+    def test_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'menu.csv')
+        with open(path, 'w') as output:
+            output.write('id,title,price,featured,category_id\n,Soup,4.00,False,%d\n' % self.desserts.pk)
+        call_command('import_menu', path, stdout=io.StringIO())
+        self.assertEqual(MenuItem.objects.get(title='Soup').category, self.desserts)
+        with open(path, 'w') as output:
+            output.write('title,price\nBad,x\n')
+        with self.assertRaises(CommandError):
+            call_command('import_menu', path, stdout=io.StringIO(), stderr=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('import_menu', os.path.join(directory, 'missing.json'))
+
+
+class SalesTestCase(LittleLemonTestCase):
+    """Orders placed through the API and a recount of the daily tables."""
+
+    def rollups(self):
+        # Rows that went back to zero are left behind by deletes; a rebuild drops them.
+        return (
+            sorted((row.date, row.revenue, row.order_count) for row in DailySales.objects.all() if row.order_count),
+            sorted((row.date, row.menuitem_id, row.units, row.revenue)
+                   for row in DailyMenuItemSales.objects.all() if row.units),
+            sorted((row.date, row.delivery_crew_id, row.delivered)
+                   for row in DailyCrewDeliveries.objects.all() if row.delivered),
+        )
+
+    def recount(self):
+        sales, items, crew = {}, {}, {}
+        for order in Order.objects.all():
+            revenue, count = sales.get(order.date, (0, 0))
+            sales[order.date] = (revenue + order.total, count + 1)
+            if order.status and order.delivery_crew_id:
+                key = (order.date, order.delivery_crew_id)
+                crew[key] = crew.get(key, 0) + 1
+        for item in OrderItem.objects.select_related('order'):
+            key = (item.order.date, item.menuitem_id)
+            units, revenue = items.get(key, (0, 0))
+            items[key] = (units + item.quantity, revenue + item.price)
+        return (
+            sorted((date,) + value for date, value in sales.items()),
+            sorted(key + value for key, value in items.items()),
+            sorted(key + (delivered,) for key, delivered in crew.items()),
+        )
+
+    def place_orders(self):
+        client = self.client_for(self.customer)
+        for lines in (2, 3):
+            for menuItem in self.menuItems[:lines]:
+                client.post('/api/cart/menu-items', {'menuitem_id': menuItem.pk, 'quantity': 2})
+            self.assertEqual(client.post('/api/orders/').status_code, 201)
+        return Order.objects.order_by('pk')
+
+
+class RollupTests(SalesTestCase):
+    """The daily tables must always equal a recount of the orders."""
+
+    def test_checkout_delivery_and_delete(self):
+        first, second = self.place_orders()
+        self.assertEqual(self.rollups(), self.recount())
+        crew = self.client_for(self.crew)
+        for delivered in (True, False, True):
+            response = crew.patch('/api/orders/%d/' % first.pk, {'status': delivered}, format='json')
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(self.rollups(), self.recount())
+        self.assertEqual(self.client_for(self.manager).delete('/api/orders/%d/' % second.pk).status_code, 200)
+        self.assertEqual(self.rollups(), self.recount())
+
+    def test_rebuild(self):
+        # add_order writes orders directly, so only a rebuild counts them.
+        self.add_order(self.customer, delivery_crew=self.crew, status=True)
+        self.add_order(self.manager, lines=3)
+        self.place_orders()
+        DailySales.objects.update(revenue=0)
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        self.assertEqual(self.rollups(), self.recount())
+
+
+class ReportTests(SalesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        first, second = self.place_orders()
+        self.client_for(self.crew).patch('/api/orders/%d/' % first.pk, {'status': True}, format='json')
+        self.client = self.client_for(self.manager)
+
+    def test_reports(self):
+        sales = self.client.get('/api/reports/sales').json()
+        self.assertEqual([day['order_count'] for day in sales], [2])
+        topItems = self.client.get('/api/reports/top-items', {'limit': 2}).json()
+        self.assertEqual([item['units'] for item in topItems], [4, 4])
+        crew = self.client.get('/api/reports/crew').json()
+        self.assertEqual(crew, [{'delivery_crew_id': self.crew.pk, 'username': 'crew', 'delivered': 1}])
+        self.assertEqual(self.client.get('/api/reports/sales', {'to': '2000-01-01'}).json(), [])
+
+    def test_bad_parameters(self):
+        for limit in ('x', '-1', '0', '101'):
+            response = self.client.get('/api/reports/top-items', {'limit': limit})
+            self.assertEqual(response.status_code, 400, limit)
+        self.assertEqual(self.client.get('/api/reports/sales', {'from': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/sales', {'from': '2024-02-30'}).status_code, 400)
+
+    def test_managers_only(self):
+        self.assertEqual(self.client_for(self.customer).get('/api/reports/sales').status_code, 403)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                        'LOCATION': 'throttles'}})
+class ThrottleTests(SimpleTestCase):
+    """4 requests a minute for one user, on a clock the test moves."""
+    view = SimpleNamespace(throttle_rates={'user': '4/m'})
+    key = 'littlelemon:throttle:user:1'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.dict(throttling.stores, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = RequestFactory().get('/api/orders/')
+        self.request.user = SimpleNamespace(pk=1, is_authenticated=True)
+
+    def hit(self, now):
+        throttle = UserThrottle()
+        throttle.timer = lambda: now
+        return throttle.allow_request(self.request, self.view), throttle
+
+    def hits(self, now, count):
+        return [self.hit(now)[0] for _ in range(count)]
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        for store in ('default', 'local'):
+            with self.subTest(store=store), override_settings(THROTTLE_STORE=store):
+                cache.clear()
+                throttling.stores.clear()
+                self.assertEqual(self.hits(600, 5), [True] * 4 + [False])
+                # 15s into the next window the last one still counts 4 * 0.75 = 3.
+                self.assertEqual(self.hits(675, 2), [True, False])
+                # At 45s it counts 1, so two more fit.
+                self.assertEqual(self.hits(705, 3), [True, True, False])
+                # Two windows on, nothing is left of either.
+                self.assertEqual(self.hits(780, 5), [True] * 4 + [False])
+
+    def test_wait_is_the_rest_of_the_window(self):
+        with override_settings(THROTTLE_STORE='default'):
+            self.hits(600, 4)
+            allowed, throttle = self.hit(675)
+            self.assertTrue(allowed)
+            allowed, throttle = self.hit(675)
+            self.assertFalse(allowed)
+            self.assertEqual(throttle.wait(), 45)
+
+    def test_each_window_has_its_own_cache_key(self):
+        with override_settings(THROTTLE_STORE='default'):
+            self.hits(600, 5)
+            # The rejected fifth request is taken back.
+            self.assertEqual(cache.get(self.key + ':10'), 4)
+            # Half way into the next window: 4 * 0.5 + 1 fits.
+            self.assertEqual(self.hits(690, 1), [True])
+            self.assertEqual(cache.get(self.key + ':11'), 1)
+            self.assertEqual(cache.get(self.key + ':10'), 4)
+
+
+class CacheCheckTests(SimpleTestCase):
+    locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                          'LOCATION': '/tmp/littlelemon-check-cache'}}
+
+    def test_menu_cache_must_be_shared(self):
+        with override_settings(CACHES=self.locmem):
+            self.assertEqual([error.id for error in check_menu_cache(None)], ['LittleLemonAPI.E003'])
+        with override_settings(CACHES=self.shared):
+            self.assertEqual(check_menu_cache(None), [])
+
+    def test_snapshot_stores_need_shared_cache(self):
+        for store in ('cache', '/tmp/menu_snapshots'):
+            with override_settings(CACHES=self.locmem, MENU_SNAPSHOT_STORE=store):
+                self.assertEqual([error.id for error in check_snapshot_store(None)], ['LittleLemonAPI.E001'])
+            with override_settings(CACHES=self.shared, MENU_SNAPSHOT_STORE=store):
+                self.assertEqual(check_snapshot_store(None), [])
+        with override_settings(CACHES=self.locmem, MENU_SNAPSHOT_STORE=None):
+            self.assertEqual(check_snapshot_store(None), [])
+
+    def test_auth_caches_need_shared_cache(self):
+        with override_settings(CACHES=self.locmem, TOKEN_CACHE_TIMEOUT=300, ROLE_CACHE_TIMEOUT=0):
+            self.assertEqual([error.id for error in check_auth_caches(None)], ['LittleLemonAPI.E002'])
+        with override_settings(CACHES=self.shared, TOKEN_CACHE_TIMEOUT=300, ROLE_CACHE_TIMEOUT=300):
+            self.assertEqual(check_auth_caches(None), [])
+        with override_settings(CACHES=self.locmem, TOKEN_CACHE_TIMEOUT=0, ROLE_CACHE_TIMEOUT=0):
+            self.assertEqual(check_auth_caches(None), [])
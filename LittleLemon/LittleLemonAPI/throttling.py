@@ -0,0 +1,166 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class LocalMemoryStore:
+    """Per-process sliding window counters, sharded to spread lock contention.
+
+    Each key keeps only ``[window index, current count, previous count]``,
+    so a hit is O(1) whatever the rate.
+    """
+
+    def __init__(self, shards=16, max_entries=10000):
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_entries = max_entries
+
+    def shard(self, key):
+        return self.shards[hash(key) % len(self.shards)]
+
+    def hit(self, key, index, timeout):
+        counters, lock = self.shard(key)
+        with lock:
+            entry = counters.get(key)
+            if entry is None or entry[0] < index - 1:
+                if entry is None and len(counters) >= self.max_entries:
+                    self.prune(counters, index)
+                entry = counters[key] = [index, 0, 0]
+            elif entry[0] == index - 1:
+                entry[:] = [index, 0, entry[1]]
+            entry[1] += 1
+            return entry[2], entry[1]
+
+    def unhit(self, key, index):
+        counters, lock = self.shard(key)
+        with lock:
+            entry = counters.get(key)
+            if entry is not None and entry[0] == index and entry[1] > 0:
+                entry[1] -= 1
+
+    def prune(self, counters, index):
+        for key in [key for key, entry in counters.items() if entry[0] < index - 1]:
+            del counters[key]
+
+
+class CacheStore:
+    """Sliding window counters in a Django cache, shared by all workers.
+
+    Each window is its own key, bumped with the backend's atomic ``incr``
+    (Redis and Memcached implement it server side), so concurrent workers
+    never lose a hit to a read-modify-write race.
+    """
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    def hit(self, key, index, timeout):
+        cache = caches[self.alias]
+        currentKey = '%s:%d' % (key, index)
+        cache.add(currentKey, 0, timeout)
+        try:
+            current = cache.incr(currentKey)
+        except ValueError:
+            # Evicted between add() and incr(); start the window again.
+            cache.set(currentKey, 1, timeout)
+            current = 1
+        previous = cache.get('%s:%d' % (key, index - 1), 0)
+        return previous, current
+
+    def unhit(self, key, index):
+        try:
+            caches[self.alias].decr('%s:%d' % (key, index))
+        except ValueError:
+            pass
+
+
+stores = {}
+stores_lock = threading.Lock()
+
+def get_throttle_store():
+    """Return the store named by ``THROTTLE_STORE``: 'local' or a cache alias."""
+    name = getattr(settings, 'THROTTLE_STORE', 'default')
+    if name not in stores:
+        with stores_lock:
+            if name not in stores:
+                stores[name] = LocalMemoryStore() if name == 'local' else CacheStore(name)
+    return stores[name]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Rate throttle using the sliding window counter approximation.
+
+    The request count is the current fixed window plus the previous one
+    weighted by how much of it still overlaps the sliding window. Rates come
+    from ``DEFAULT_THROTTLE_RATES[scope]`` and can be overridden per view
+    with a ``throttle_rates = {scope: rate}`` attribute.
+    """
+    scope = None
+    timer = time.time
+
+    def get_rate(self, view):
+        rates = getattr(view, 'throttle_rates', None) or {}
+        if self.scope in rates:
+            return rates[self.scope]
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured("No default throttle rate set for '%s' scope" % self.scope)
+
+    def parse_rate(self, rate):
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), duration
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def allow_request(self, request, view):
+        rate = self.get_rate(view)
+        if rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        self.num_requests, self.duration = self.parse_rate(rate)
+        now = self.timer()
+        self.index = int(now // self.duration)
+        self.elapsed = now - self.index * self.duration
+        store = get_throttle_store()
+        previous, current = store.hit(key, self.index, self.duration * 2)
+        weight = 1 - self.elapsed / self.duration
+        if previous * weight + current <= self.num_requests:
+            return True
+        # Rejected requests are not counted, as with DRF's own throttles.
+        store.unhit(key, self.index)
+        return False
+
+    def wait(self):
+        return self.duration - self.elapsed
+
+
+class UserThrottle(SlidingWindowThrottle):
+    """Limits users by id, and anonymous clients by IP, at the 'user' rate."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return 'littlelemon:throttle:%s:%s' % (self.scope, ident)
+
+
+class AnonThrottle(SlidingWindowThrottle):
+    """Limits anonymous clients by IP at the 'anon' rate."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return 'littlelemon:throttle:%s:%s' % (self.scope, self.get_ident(request))
@@ -0,0 +1,104 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+
+
+class LocalLRU:
+    """A small thread-safe LRU map whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries, ttl, timer=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.timer = timer
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= self.timer():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, self.timer() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TokenCache:
+    """Token -> user id, username, is_active and group names.
+
+    Entries live in the Django cache for ``TOKEN_CACHE_TIMEOUT`` seconds (0,
+    the default, turns the cache off) and in a per-process LRU for
+    ``TOKEN_CACHE_LOCAL_TTL`` seconds in front of it. Invalidation clears
+    the Django cache and this process's LRU, so with a cache shared by all
+    workers (see checks.py) another process can keep using an entry for at
+    most the local TTL. Cache keys are digests, never the tokens themselves.
+    """
+
+    def __init__(self):
+        self.local = LocalLRU(getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+                              getattr(settings, 'TOKEN_CACHE_LOCAL_TTL', 10))
+
+    def timeout(self):
+        return getattr(settings, 'TOKEN_CACHE_TIMEOUT', 0)
+
+    def key(self, token_key):
+        return 'littlelemon:token:%s' % hashlib.sha256(token_key.encode()).hexdigest()
+
+    def get(self, token_key):
+        if not self.timeout():
+            return None
+        key = self.key(token_key)
+        entry = self.local.get(key)
+        if entry is None:
+            entry = cache.get(key)
+            if entry is not None:
+                self.local.set(key, entry)
+        return entry
+
+    def set(self, token_key, entry):
+        if not self.timeout():
+            return
+        key = self.key(token_key)
+        cache.set(key, entry, self.timeout())
+        self.local.set(key, entry)
+
+    def forget(self, *token_keys):
+        keys = [self.key(token_key) for token_key in token_keys]
+        cache.delete_many(keys)
+        self.local.delete(*keys)
+
+    def forget_users(self, *user_ids):
+        # A user has at most one token, so there is no per-user key list to
+        # keep in step with concurrent sets: the token keys come from the table.
+        if self.timeout():
+            self.forget(*Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True))
+
+    def clear(self):
+        self.local.clear()
+
+
+token_cache = TokenCache()
@@ -1,4 +1,6 @@
 from . import views
+from .async_views import async_read, menu_items_list, menu_items_retrieve, cart_list, orders_list, orders_retrieve, order_events
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
@@ -8,10 +10,86 @@ router.register('groups/manager/users', views.GroupsManagerView, basename='manag
 router.register('groups/delivery_crew/users', views.GroupsDeliveryCrewView, basename='delivery_crew')
 router.register('orders', views.OrdersView, basename='orders')
 
+cart_view = views.CustomerCartView.as_view({
+    'get':'list',
+    'post':'create',
+    'delete':'destroy',
+})
+
+# Routes listed in ASYNC_READ_ROUTES answer plain GETs from async_views and
+# everything else from the ViewSet; the router below covers the rest.
+async_routes = []
+if 'menu_items' in settings.ASYNC_READ_ROUTES:
+    async_routes += [
+        path('menu_items/', async_read(menu_items_list, views.MenuItemView.as_view({
+            'get':'list',
+            'post':'create',
+        }))),
+        path('menu_items/<pk>/', async_read(menu_items_retrieve, views.MenuItemView.as_view({
+            'get':'retrieve',
+            'put':'update',
+            'patch':'partial_update',
+            'delete':'destroy',
+        }))),
+    ]
+if 'cart' in settings.ASYNC_READ_ROUTES:
+    cart_view = async_read(cart_list, cart_view)
+if 'orders' in settings.ASYNC_READ_ROUTES:
+    async_routes += [
+        path('orders/', async_read(orders_list, views.OrdersView.as_view({
+            'get':'list',
+            'post':'create',
+        }))),
+        path('orders/<pk>/', async_read(orders_retrieve, views.OrdersView.as_view({
+            'get':'retrieve',
+            'put':'update',
+            'patch':'partial_update',
+            'delete':'destroy',
+        }))),
+    ]
+
 urlpatterns =[
-    path('cart/menu-items', views.CustomerCartView.as_view({
-        'get':'list',
-        'post':'create',
-        'delete':'destroy',
-    }))
-] + router.urls
\ No newline at end of file
+    path('menu_items/bulk', views.MenuItemView.as_view({
+        'post':'bulk',
+    })),
+    path('groups/manager/users/bulk', views.GroupsManagerView.as_view({
+        'post':'bulk_add',
+        'delete':'bulk_remove',
+    })),
+    path('groups/delivery_crew/users/bulk', views.GroupsDeliveryCrewView.as_view({
+        'post':'bulk_add',
+        'delete':'bulk_remove',
+    })),
+    path('groups/delivery_crew/users/<int:pk>/shift', views.GroupsDeliveryCrewView.as_view({
+        'post':'start_shift',
+        'delete':'end_shift',
+    })),
+    path('cart/menu-items', cart_view),
+    path('cart/menu-items/batch', views.CustomerCartView.as_view({
+        'post':'batch',
+    })),
+    path('cart/menu-items/<int:pk>', views.CustomerCartView.as_view({
+        'patch':'partial_update',
+        'delete':'remove_line',
+    })),
+    path('cart/summary', views.CustomerCartView.as_view({
+        'get':'summary',
+    })),
+    path('orders/events', order_events),
+    path('orders/export', views.OrdersView.as_view({
+        'get':'export',
+    })),
+    path('reports/sales', views.ReportsView.as_view({
+        'get':'sales',
+    })),
+    path('reports/top-items', views.ReportsView.as_view({
+        'get':'top_items',
+    })),
+    path('reports/crew', views.ReportsView.as_view({
+        'get':'crew',
+    })),
+    path('profiling/slowest', views.ProfilingView.as_view({
+        'get':'slowest',
+        'delete':'clear',
+    })),
+] + async_routes + router.urls
\ No newline at end of file
@@ -1,22 +1,44 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User, Group
 from django.core.paginator import Paginator, EmptyPage
+from django.db.models import Sum
+from django.utils.dateparse import parse_date
 
-import datetime
-
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, serializers
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 
-from .models import MenuItem, Cart, Order, OrderItem
-from .serializer import MenuItemSerializer, UserSerializer, CartSerializer, OrderSerializer, OrderItemSerializer
+from .models import MenuItem, Cart, CartSummary, Order, OrderItem, DailySales, DailyMenuItemSales, DailyCrewDeliveries
+from .serializer import MenuItemSerializer, UserSerializer, RoleMembersSerializer, ShiftEndSerializer, CartSerializer, CartDeltaSerializer, CartLineSerializer, CartSummarySerializer, OrderSerializer, OrderItemSerializer, \
+    DailySalesSerializer, TopMenuItemSerializer, CrewDeliveriesSerializer
 from .permissions import *
+from .roles import MANAGER, DELIVERY_CREW, get_roles, is_manager, is_delivery_crew, is_customer, \
+    get_group_id, get_role_member_ids, missing_users, add_role_members, remove_role_members
+from .cache import cached_menu_response, menu_list_version
+from .conditional import ConditionalGetMixin, row_etag
+from .pagination import KeysetPaginator
+from .checkout import checkout
+from .idempotency import idempotent
+from .carts import add_to_cart, clear_cart, change_cart, CartError, CartLineMissing
+from .exports import csv_rows, ndjson_rows
+from .rollups import tracking_delivery, delete_order
+from .events import announcing_changes
+from .assignment import open_queue, move_open_orders, tracking_queue, set_off_shift, reassign_open_orders
+from .menu_import import parse_rows, menu_rows, import_menu_items, MenuImportError
+from .prefetch import optimize_queryset
+from .readers import menu_item_reader, cart_reader, order_reader
+from .search import get_search_backend
+from .snapshots import snapshot_response
+from .throttling import UserThrottle, AnonThrottle
+from .profiling import ProfiledViewMixin, get_slowest
+from .routers import ReplicaReadMixin
 
 # Create your views here.
 
-class MenuItemView(viewsets.ViewSet):
-    throttle_classes = [UserRateThrottle, AnonRateThrottle]
+class MenuItemView(ReplicaReadMixin, ProfiledViewMixin, ConditionalGetMixin, viewsets.ViewSet):
+    throttle_classes = [UserThrottle, AnonThrottle]
 
     def get_permissions(self):
         if(self.request.method=='GET'): 
@@ -25,13 +47,25 @@ class MenuItemView(viewsets.ViewSet):
             return [IsAuthenticated(),IsManager()]
 
     def list(self,request):
-        menuItemList= MenuItem.objects.select_related('category').all().order_by('category')
-        category_name = request.query_params.get('category')
-        featured = request.query_params.get('featured')
-        to_price=request.query_params.get('to_price')
-        search = request.query_params.get('search')
-        perpage = request.query_params.get('perpage', default=2)
-        page = request.query_params.get('page', default=1)
+        if request.accepted_renderer.format == 'json':
+            snapshot = snapshot_response(request, request.query_params)
+            if snapshot is not None:
+                return snapshot
+        prefix = 'cursor' if 'cursor' in request.query_params else 'list'
+        version = menu_list_version(request.query_params, prefix)
+        etag, menuItemData = cached_menu_response(version, lambda: self.build_list(request))
+        # DRF adds Vary: Accept, as the browsable API shares the ETag.
+        notModified = self.not_modified(request, etag=etag)
+        if notModified:
+            return notModified
+        return self.with_validators(Response(menuItemData, status.HTTP_200_OK), etag=etag)
+
+    def get_menu_items(self, query_params):
+        menuItemList= optimize_queryset(MenuItem.objects.all(), MenuItemSerializer).order_by('category')
+        category_name = query_params.get('category')
+        featured = query_params.get('featured')
+        to_price=query_params.get('to_price')
+        search = query_params.get('search')
         if category_name:
             menuItemList = menuItemList.filter(category__title = category_name)
         if to_price:
@@ -39,7 +73,23 @@ class MenuItemView(viewsets.ViewSet):
         if featured:
             menuItemList = menuItemList.filter(featured=featured)
         if search:
-            menuItemList = menuItemList.filter(title__icontains = search)
+            menuItemList = get_search_backend().filter(menuItemList, search, category=category_name,
+                                                       to_price=to_price, featured=featured)
+        return menuItemList
+
+    def build_list(self, request):
+        menuItemList = self.get_menu_items(request.query_params)
+        perpage = request.query_params.get('perpage', default=2)
+        page = request.query_params.get('page', default=1)
+
+        if 'cursor' in request.query_params:
+            paginator = KeysetPaginator(menuItemList, ['category_id', 'id'], per_page=perpage)
+            menuItemList, next_cursor = paginator.page(request.query_params.get('cursor'))
+            serialized_menuItemList = MenuItemSerializer(menuItemList, many=True)
+            return {'results': serialized_menuItemList.data, 'next_cursor': next_cursor}
+
+        if settings.FAST_READ_SERIALIZERS:
+            menuItemList = menu_item_reader.values(menuItemList)
 
         paginator = Paginator(menuItemList, per_page=perpage)
 
@@ -48,8 +98,10 @@ class MenuItemView(viewsets.ViewSet):
         except EmptyPage:
             menuItemList = []
 
+        if settings.FAST_READ_SERIALIZERS:
+            return menu_item_reader.read(menuItemList)
         serialized_menuItemList = MenuItemSerializer(menuItemList, many=True)
-        return Response(serialized_menuItemList.data, status.HTTP_200_OK)
+        return serialized_menuItemList.data
     
     def create(self, request):       
         serialized_menuItem = MenuItemSerializer(data=request.data)
@@ -65,9 +117,14 @@ class MenuItemView(viewsets.ViewSet):
         return Response(serialized_menuItem.data, status.HTTP_200_OK)
     
     def retrieve(self, request, pk=None):
-        menuItem = get_object_or_404(MenuItem, pk=pk)
+        menuItem = get_object_or_404(MenuItem.objects.select_related('category'), pk=pk)
+        etag = row_etag(menuItem.pk, menuItem.updated_at)
+        notModified = self.not_modified(request, etag=etag, last_modified=menuItem.updated_at)
+        if notModified:
+            return notModified
         serialized_menuItem= MenuItemSerializer(menuItem)
-        return Response(serialized_menuItem.data, status.HTTP_200_OK)
+        return self.with_validators(Response(serialized_menuItem.data, status.HTTP_200_OK),
+                                    etag=etag, last_modified=menuItem.updated_at)
     
     def partial_update(self, request, pk=None):
         menuItem = get_object_or_404(MenuItem, pk=pk)
@@ -76,72 +133,109 @@ class MenuItemView(viewsets.ViewSet):
         serialized_menuItem.save()
         return Response(serialized_menuItem.data, status.HTTP_200_OK)
     
+    def bulk(self, request):
+        try:
+            if request.content_type.startswith('text/csv'):
+                rows = parse_rows(request.body.decode('utf-8-sig'), 'csv')
+            else:
+                rows = menu_rows(request.data)
+        except UnicodeDecodeError:
+            return Response({'message': 'CSV must be UTF-8 encoded'}, status.HTTP_400_BAD_REQUEST)
+        except ValueError as error:
+            return Response({'message': str(error)}, status.HTTP_400_BAD_REQUEST)
+        try:
+            created, updated = import_menu_items(rows)
+        except MenuImportError as error:
+            return Response({'errors': error.errors}, status.HTTP_400_BAD_REQUEST)
+        return Response({'created': created, 'updated': updated}, status.HTTP_200_OK)
+
     def destroy(self, request, pk=None):
         menuItem = get_object_or_404(MenuItem, pk=pk)
         menuItem.delete()
         return Response({"message":"Deleting menu item"}, status.HTTP_200_OK)
     
-class GroupsManagerView(viewsets.ViewSet):
-    throttle_classes = [UserRateThrottle, AnonRateThrottle]
-    def get_permissions(self):
-        return [IsAuthenticated(),IsManager()]
+class RoleMembershipView(ProfiledViewMixin, viewsets.ViewSet):
+    """Members of ``group_name``, one at a time or in bulk."""
+    throttle_classes = [UserThrottle, AnonThrottle]
+    group_name = None
 
-    def list(self,request):
-        userManagers = User.objects.filter(groups__name = 'Manager')
-        serialized_userManagers = UserSerializer(userManagers, many=True)
-        return Response(serialized_userManagers.data, status.HTTP_200_OK)
-    
-    def create(self, request):
-        serialized_userManager = UserSerializer(data=request.data)
-        serialized_userManager.is_valid(raise_exception=True)
-        user = get_object_or_404(User, id=request.data['id'])
-        group_manager=get_object_or_404(Group, name='Manager')
-        group_manager.user_set.add(user)
-        return Response({"message":"Added user to Manager group"}, status.HTTP_201_CREATED)
-    
-    def destroy(self, request, pk=None):
-        user = get_object_or_404(User, id=pk)
-        group_manager=get_object_or_404(Group, name='Manager')
-        group_manager.user_set.remove(user)
-        return Response({"message":"Removed user from Manager group"}, status.HTTP_200_OK)
-    
-class GroupsDeliveryCrewView(viewsets.ViewSet):
-    throttle_classes = [UserRateThrottle, AnonRateThrottle]
     def get_permissions(self):
         return [IsAuthenticated(),IsManager()]
 
     def list(self,request):
-        user = User.objects.filter(groups__name = 'Delivery Crew')
-        serialized_user = UserSerializer(user, many=True)
-        return Response(serialized_user.data, status.HTTP_200_OK)
+        users = User.objects.filter(groups__name = self.group_name)
+        serialized_users = UserSerializer(users, many=True)
+        return Response(serialized_users.data, status.HTTP_200_OK)
     
     def create(self, request):
         serialized_user = UserSerializer(data=request.data)
         serialized_user.is_valid(raise_exception=True)
         user = get_object_or_404(User, id=request.data['id'])
-        group_deliveryCrew=get_object_or_404(Group, name='Delivery Crew')
-        group_deliveryCrew.user_set.add(user)
-        return Response({"message":"Added user to Delivery Crew group"}, status.HTTP_201_CREATED)
+        user.groups.add(get_group_id(self.group_name))
+        return Response({"message":"Added user to %s group" % self.group_name}, status.HTTP_201_CREATED)
     
     def destroy(self, request, pk=None):
         user = get_object_or_404(User, id=pk)
-        group_deliveryCrew=get_object_or_404(Group, name='Delivery Crew')
-        group_deliveryCrew.user_set.remove(user)
-        return Response({"message":"Removed user from Delivery Crew group"}, status.HTTP_200_OK)
-    
-class CustomerCartView(viewsets.ViewSet):
-    throttle_classes = [UserRateThrottle, AnonRateThrottle]
+        user.groups.remove(get_group_id(self.group_name))
+        return Response({"message":"Removed user from %s group" % self.group_name}, status.HTTP_200_OK)
+
+    def validated_users(self, request):
+        serialized_members = RoleMembersSerializer(data=request.data)
+        serialized_members.is_valid(raise_exception=True)
+        userIds = serialized_members.validated_data['users']
+        return userIds, missing_users(userIds)
+
+    def bulk_add(self, request):
+        userIds, missing = self.validated_users(request)
+        if missing:
+            return Response({'message':'Unknown users', 'users':missing}, status.HTTP_400_BAD_REQUEST)
+        add_role_members(self.group_name, userIds)
+        return Response({"message":"Added %d users to %s group" % (len(set(userIds)), self.group_name)},
+                        status.HTTP_201_CREATED)
+
+    def bulk_remove(self, request):
+        userIds, missing = self.validated_users(request)
+        if missing:
+            return Response({'message':'Unknown users', 'users':missing}, status.HTTP_400_BAD_REQUEST)
+        removed = remove_role_members(self.group_name, userIds)
+        return Response({"message":"Removed %d users from %s group" % (removed, self.group_name)},
+                        status.HTTP_200_OK)
+
+class GroupsManagerView(RoleMembershipView):
+    group_name = MANAGER
+
+class GroupsDeliveryCrewView(RoleMembershipView):
+    group_name = DELIVERY_CREW
+
+    def start_shift(self, request, pk=None):
+        user = get_object_or_404(User, id=pk, groups__name=DELIVERY_CREW)
+        set_off_shift(user.pk, False)
+        return Response({"message":"%s is on shift" % user.username}, status.HTTP_200_OK)
+
+    def end_shift(self, request, pk=None):
+        """Stop assigning orders to a crew member and hand theirs on."""
+        user = get_object_or_404(User, id=pk, groups__name=DELIVERY_CREW)
+        serialized_shift = ShiftEndSerializer(data=request.data)
+        serialized_shift.is_valid(raise_exception=True)
+        toCrew = serialized_shift.validated_data.get('to')
+        if toCrew is not None and (toCrew == user.pk or toCrew not in get_role_member_ids(DELIVERY_CREW)):
+            return Response({'message':'Unknown delivery crew member'}, status.HTTP_400_BAD_REQUEST)
+        set_off_shift(user.pk, True)
+        moved = reassign_open_orders(user.pk, toCrew)
+        return Response({"message":"%s is off shift" % user.username,
+                         "reassigned": {str(crewId): count for crewId, count in moved.items()}}, status.HTTP_200_OK)
+
+class CustomerCartView(ProfiledViewMixin, viewsets.ViewSet):
+    throttle_classes = [UserThrottle, AnonThrottle]
     def get_permissions(self):
         return [IsAuthenticated(),IsCustomer()]
 
-    def list(self,request):
-        cart = Cart.objects.filter(user = request.user)
+    def get_cart(self, query_params, user):
+        cart = optimize_queryset(Cart.objects.filter(user = user), CartSerializer)
 
-        menuitem = request.query_params.get('menuitem')
-        to_price = request.query_params.get('price')
-        search = request.query_params.get('search')
-        perpage = request.query_params.get('perpage', default=2)
-        page = request.query_params.get('page', default=1)
+        menuitem = query_params.get('menuitem')
+        to_price = query_params.get('price')
+        search = query_params.get('search')
         if menuitem:
             cart = cart.filter(menuitem = menuitem)
         if to_price:
@@ -149,95 +243,166 @@ class CustomerCartView(viewsets.ViewSet):
 
         if search:
             cart = cart.filter(user__username__icontains = search)
+        return cart
+
+    def list(self,request):
+        cart = self.get_cart(request.query_params, request.user)
+        perpage = request.query_params.get('perpage', default=2)
+        page = request.query_params.get('page', default=1)
+
+        if 'cursor' in request.query_params:
+            paginator = KeysetPaginator(cart, ['id'], per_page=perpage)
+            cart, next_cursor = paginator.page(request.query_params.get('cursor'))
+            serialized_cart = CartSerializer(cart, many=True)
+            return Response({'results': serialized_cart.data, 'next_cursor': next_cursor}, status.HTTP_200_OK)
+
+        if settings.FAST_READ_SERIALIZERS:
+            cart = cart_reader.values(cart)
+
         paginator = Paginator(cart, per_page=perpage)
         try:
             cart = paginator.page(number=page)
         except EmptyPage:
             cart = []
 
+        if settings.FAST_READ_SERIALIZERS:
+            return Response(cart_reader.read(cart), status.HTTP_200_OK)
 
         serialized_cart = CartSerializer(cart, many=True)
         return Response(serialized_cart.data, status.HTTP_200_OK)
 
+    @idempotent
     def create(self, request):
         serialized_cart = CartSerializer(data=request.data, context={'request': request})
         serialized_cart.is_valid(raise_exception=True)
         menuitem = get_object_or_404(MenuItem, pk=serialized_cart.validated_data['menuitem_id'])
-        serialized_cart.save(
-            user = request.user,
-            unit_price = menuitem.price,
-            price = menuitem.price * serialized_cart.validated_data['quantity']
-        )
-        
+        add_to_cart(serialized_cart, request.user, menuitem)
+
         return Response(serialized_cart.data, status.HTTP_201_CREATED)
     
     def destroy(self, request, pk=None):
-        Cart.objects.filter(user=request.user).delete()
+        clear_cart(request.user)
         return Response({"message":"Deleted all carts for user"}, status.HTTP_200_OK)
+
+    def change_lines(self, request, changes, relative=True, require_existing=False):
+        try:
+            lines, removed, summary = change_cart(request.user, changes, relative, require_existing)
+        except CartLineMissing as error:
+            return Response({'errors': error.errors}, status.HTTP_404_NOT_FOUND)
+        except CartError as error:
+            return Response({'errors': error.errors}, status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'lines': CartSerializer(lines, many=True).data,
+            'removed': removed,
+            'summary': CartSummarySerializer(summary).data,
+        }, status.HTTP_200_OK)
+
+    def partial_update(self, request, pk=None):
+        serialized_line = CartLineSerializer(data=request.data)
+        serialized_line.is_valid(raise_exception=True)
+        return self.change_lines(request, {int(pk): serialized_line.validated_data['quantity']},
+                                 relative=False, require_existing=True)
+
+    def remove_line(self, request, pk=None):
+        return self.change_lines(request, {int(pk): 0}, relative=False, require_existing=True)
+
+    @idempotent
+    def batch(self, request):
+        """Apply a list of ``{menuitem_id, quantity_delta}`` operations in one go."""
+        operations = request.data.get('items', []) if isinstance(request.data, dict) else request.data
+        serialized_operations = CartDeltaSerializer(data=operations, many=True, allow_empty=False, max_length=1000)
+        serialized_operations.is_valid(raise_exception=True)
+        changes = {}
+        for operation in serialized_operations.validated_data:
+            menuitem_id = operation['menuitem_id']
+            changes[menuitem_id] = changes.get(menuitem_id, 0) + operation['quantity_delta']
+        return self.change_lines(request, changes)
+
+    def summary(self, request):
+        summary = CartSummary.objects.filter(user=request.user).first() or CartSummary(user=request.user)
+        serialized_summary = CartSummarySerializer(summary)
+        return Response(serialized_summary.data, status.HTTP_200_OK)
     
-class OrdersView(viewsets.ViewSet):
-    throttle_classes = [UserRateThrottle, AnonRateThrottle]
+class OrdersView(ReplicaReadMixin, ProfiledViewMixin, ConditionalGetMixin, viewsets.ViewSet):
+    throttle_classes = [UserThrottle, AnonThrottle]
     def get_permissions(self):
         return [IsAuthenticated()]
 
-    def list(self,request):
-        if IsCustomer():
-            orders= Order.objects.filter(user=request.user).order_by('date')
-        elif IsManager():
+    def get_orders(self, query_params, user, roles):
+        if not (MANAGER in roles or DELIVERY_CREW in roles):
+            orders= Order.objects.filter(user=user).order_by('date')
+        elif MANAGER in roles:
             orders= Order.objects.all().order_by('date')
-        elif IsDeliveryCrew():
-            orders= Order.objects.filter(deliver_crew = request.user).order_by('date')
+        else:
+            orders= Order.objects.filter(delivery_crew = user).order_by('date')
+        orders = self.filter_orders(optimize_queryset(orders, OrderSerializer), query_params)
 
-        to_date = request.query_params.get('date')
-        status=request.query_params.get('status')
-        delivery_crew= request.query_params.get('delivery_crew')
-        search = request.query_params.get('search')
-        perpage = request.query_params.get('perpage', default=2)
-        page = request.query_params.get('page', default=1)
-        if to_date:
-            orders = orders.filter(date__lte = to_date)
-        if status:
-            orders = orders.filter(status=status)
-        if delivery_crew:
-            orders = orders.filter(delivery_crew=delivery_crew)
+        search = query_params.get('search')
         if search:
             orders = orders.filter(user__username__icontains = search)
+        return orders
+
+    def list(self,request):
+        orders = self.get_orders(request.query_params, request.user, get_roles(request))
+        perpage = request.query_params.get('perpage', default=2)
+        page = request.query_params.get('page', default=1)
+
+        if 'cursor' in request.query_params:
+            paginator = KeysetPaginator(orders, ['date', 'id'], per_page=perpage)
+            orders, next_cursor = paginator.page(request.query_params.get('cursor'))
+            serialized_order = OrderSerializer(orders, many=True)
+            return Response({'results': serialized_order.data, 'next_cursor': next_cursor}, status.HTTP_200_OK)
+
+        if settings.FAST_READ_SERIALIZERS:
+            orders = order_reader.values(orders)
+
         paginator = Paginator(orders, per_page=perpage)
         try:
             orders = paginator.page(number=page)
         except EmptyPage:
             orders = []
 
+        if settings.FAST_READ_SERIALIZERS:
+            return Response(order_reader.read(orders), status.HTTP_200_OK)
+
         serialized_order = OrderSerializer(orders, many=True)
         return Response(serialized_order.data, status.HTTP_200_OK)
     
+    def filter_orders(self, orders, query_params):
+        to_date = query_params.get('date')
+        order_status=query_params.get('status')
+        delivery_crew= query_params.get('delivery_crew')
+        if to_date:
+            orders = orders.filter(date__lte = to_date)
+        if order_status:
+            orders = orders.filter(status=order_status)
+        if delivery_crew:
+            orders = orders.filter(delivery_crew=delivery_crew)
+        return orders
+
+    def export(self, request):
+        # The rows are read while the response streams, after dispatch() has
+        # left ReplicaReadMixin's replica_reads(), so exports always read
+        # from the primary.
+        if is_manager(request):
+            orders = self.filter_orders(Order.objects.all(), request.query_params)
+            if request.query_params.get('output') == 'csv':
+                response = StreamingHttpResponse(csv_rows(orders), content_type='text/csv')
+                response['Content-Disposition'] = 'attachment; filename="orders.csv"'
+            else:
+                response = StreamingHttpResponse(ndjson_rows(orders), content_type='application/x-ndjson')
+            return response
+
+        else:
+            return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
+
+    @idempotent
     def create(self, request):
-        if not (request.user.groups.filter(name='Manager').exists() or\
-                request.user.groups.filter(name='Delivery Crew').exists()):
+        if is_customer(request):
 
             serialized_menuItem = OrderItemSerializer(data=request.data)
             serialized_menuItem.is_valid(raise_exception=True)
-            cart = Cart.objects.filter(user=request.user)
-            newOrder = Order(
-                user = request.user,
-                total = 0,
-                date = datetime.date.today()
-            )
-            newOrder.save()
-            for item in cart:
-                orderitem = OrderItem(
-                    order = newOrder,
-                    menuitem = item.menuitem,
-                    quantity = item.quantity,
-                    unit_price = item.unit_price,
-                    price = item.price
-                )
-                orderitem.save()
-                newOrder.total += item.price
-
-            newOrder.save()
-            cart.delete()
-            orderItemsAll = OrderItem.objects.filter(order=newOrder)
+            newOrder, orderItemsAll = checkout(request.user)
             serialized_order = OrderSerializer(newOrder, many=False)
             serialized_orderItem = OrderItemSerializer(orderItemsAll, many=True)
             return Response({'order_data':serialized_order.data,'order_item_data':serialized_orderItem.data}, status.HTTP_201_CREATED)
@@ -246,58 +411,137 @@ class OrdersView(viewsets.ViewSet):
             return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
     
     def update(self, request, pk=None):      
-        if request.user.groups.filter(name='Manager').exists():
+        if is_manager(request):
             order = get_object_or_404(Order, pk=pk)
             serialized_order = OrderSerializer(order, data=request.data)
             serialized_order.is_valid(raise_exception=True)
-            serialized_order.save(
-                status = serialized_order.validated_data['status']
-            )
+            with tracking_delivery(order), tracking_queue(order), announcing_changes(order):
+                serialized_order.save(
+                    status = serialized_order.validated_data['status']
+                )
             return Response(serialized_order.data, status.HTTP_200_OK)
         
         else:
             return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
     
     def retrieve(self, request, pk=None):
-        if not (request.user.groups.filter(name='Manager').exists() or\
-                request.user.groups.filter(name='Delivery Crew').exists()):
+        if is_customer(request):
             
-            order = get_object_or_404(Order, pk=pk)
+            order = get_object_or_404(optimize_queryset(Order.objects.all(), OrderSerializer), pk=pk)
             if order.user != request.user:
                 return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
-            
+
+            etag = row_etag(order.pk, order.updated_at)
+            notModified = self.not_modified(request, etag=etag, last_modified=order.updated_at)
+            if notModified:
+                return notModified
             serialized_order= OrderSerializer(order)
-            return Response(serialized_order.data, status.HTTP_200_OK)
+            return self.with_validators(Response(serialized_order.data, status.HTTP_200_OK),
+                                        etag=etag, last_modified=order.updated_at)
         
         else:
             return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
     
     def partial_update(self, request, pk=None):
-        if request.user.groups.filter(name='Delivery Crew').exists():
+        if is_delivery_crew(request):
             order = get_object_or_404(Order, pk=pk)
             if order.delivery_crew != request.user:
                 return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
             serialized_order = OrderSerializer(order, data=request.data)
             serialized_order.is_valid(raise_exception=True)
-            order.status = serialized_order.validated_data['status']
-            order.save()
+            with tracking_delivery(order), tracking_queue(order), announcing_changes(order):
+                order.status = serialized_order.validated_data['status']
+                order.save()
             return Response(serialized_order.data, status.HTTP_200_OK)
         
-        elif request.user.groups.filter(name='Manager').exists():
+        elif is_manager(request):
             order = get_object_or_404(Order, pk=pk)
             serialized_order = OrderSerializer(order, data=request.data)
             serialized_order.is_valid(raise_exception=True)
-            serialized_order.save()
+            with tracking_delivery(order), tracking_queue(order), announcing_changes(order):
+                serialized_order.save()
             return Response(serialized_order.data, status.HTTP_200_OK)
         
         else:
             return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
     
     def destroy(self, request, pk=None):
-        if request.user.groups.filter(name='Manager').exists():
+        if is_manager(request):
             order = get_object_or_404(Order, pk=pk)
-            order.delete()
+            delete_order(order)
+            move_open_orders(open_queue(order), None)
             return Response({"message":"Deleting order"}, status.HTTP_200_OK)
         
         else:
-            return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+            return Response({'message':'Unauthorized User'},status.HTTP_401_UNAUTHORIZED)
+    
+class ReportsView(ProfiledViewMixin, viewsets.ViewSet):
+    throttle_classes = [UserThrottle, AnonThrottle]
+    def get_permissions(self):
+        return [IsAuthenticated(),IsManager()]
+
+    max_limit = 100
+
+    def date_param(self, request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            date = parse_date(value)
+        except ValueError:
+            date = None
+        if date is None:
+            raise serializers.ValidationError({name: 'Date invalid'})
+        return date
+
+    def limit_param(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_limit:
+            raise serializers.ValidationError({'limit': 'Limit invalid'})
+        return limit
+
+    def date_range(self, queryset, request, field='date'):
+        start = self.date_param(request, 'from')
+        end = self.date_param(request, 'to')
+        if start:
+            queryset = queryset.filter(**{field + '__gte': start})
+        if end:
+            queryset = queryset.filter(**{field + '__lte': end})
+        return queryset
+
+    def sales(self, request):
+        sales = self.date_range(DailySales.objects.order_by('date'), request)
+        serialized_sales = DailySalesSerializer(sales, many=True)
+        return Response(serialized_sales.data, status.HTTP_200_OK)
+
+    def top_items(self, request):
+        limit = self.limit_param(request)
+        items = self.date_range(DailyMenuItemSales.objects.all(), request) \
+            .values('menuitem', 'menuitem__title') \
+            .annotate(units=Sum('units'), revenue=Sum('revenue')) \
+            .order_by('-units', 'menuitem')[:limit]
+        serialized_items = TopMenuItemSerializer(items, many=True)
+        return Response(serialized_items.data, status.HTTP_200_OK)
+
+    def crew(self, request):
+        crew = self.date_range(DailyCrewDeliveries.objects.all(), request) \
+            .values('delivery_crew', 'delivery_crew__username') \
+            .annotate(delivered=Sum('delivered')) \
+            .order_by('-delivered', 'delivery_crew')
+        serialized_crew = CrewDeliveriesSerializer(crew, many=True)
+        return Response(serialized_crew.data, status.HTTP_200_OK)
+
+class ProfilingView(ProfiledViewMixin, viewsets.ViewSet):
+    throttle_classes = [UserThrottle, AnonThrottle]
+    def get_permissions(self):
+        return [IsAuthenticated(),IsManager()]
+
+    def slowest(self, request):
+        return Response(get_slowest().snapshot(), status.HTTP_200_OK)
+
+    def clear(self, request):
+        get_slowest().clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)